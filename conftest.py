@@ -0,0 +1 @@
+# 让测试可以从仓库根目录导入 utils/src 等包
@@ -2,8 +2,10 @@
 import time
 import signal
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, Dict, Any
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple
+import cv2
 import numpy as np
 
 from utils.config import ConfigManager
@@ -11,11 +13,17 @@ from utils.events import EventBus, EventType, EventFactory
 from utils.logger import ThreadSafeLogger
 
 from core.camera import CameraController
-from core.processing import ImagePreprocessor, HybridDetector, SceneAnalyzer
-from core.narration import NarrativeEngine, TTSService
+from core.processing import ImagePreprocessor, HybridDetector, BatchingDetector, SceneAnalyzer
+from core.narration import NarrativeEngine, TTSService, SceneContext
 from core.user_interaction import UserInteraction
 
 
+# 语音播报优先级（数值越大越先播放）：场景描述1，指令应答2，风险警示3，系统故障警报4
+COMMAND_PRIORITY = 2
+ALERT_PRIORITY = 3
+SYSTEM_ALERT_PRIORITY = 4
+
+
 class VisionAssistant:
     """主控制系统，协调所有模块工作"""
 
@@ -27,7 +35,11 @@ class VisionAssistant:
 
         # 加载配置和核心模块
         self.config = ConfigManager("config/app_config.yaml")
-        self.event_bus = EventBus()
+        self.event_bus = EventBus(
+            capacity=self.config.get("events.capacity", 1024),
+            synchronize_enqueue_when_full=self.config.get(
+                "events.synchronize_enqueue_when_full", True)
+        )
         self.logger = ThreadSafeLogger(self.config)
         self.logger.connect_event_bus(self.event_bus)
 
@@ -60,8 +72,25 @@ class VisionAssistant:
 
     def _init_processing_pipeline(self):
         """初始化图像处理流水线"""
-        self.preprocessor = ImagePreprocessor(self.config)
         self.detector = HybridDetector(self.config)
+        # 允许合批时才经由检测线程，否则在当前线程直接检测，省去Future与队列开销。
+        # 启用跟踪时检测器逐帧推理，合批没有收益
+        self.batcher = None
+        # 预处理输出缓冲需覆盖下游尚未用完的帧，外加一帧正在后台预处理
+        buffer_count = 2
+        if self.config.get("detector.max_batch", 4) > 1 and not self.detector.tracking:
+            self.batcher = BatchingDetector(self.detector, self.config)
+            buffer_count = self.batcher.frames_in_flight + 2
+        self.preprocessor = ImagePreprocessor(self.config, buffer_count=buffer_count)
+
+        # 两级流水：本帧的预处理在线程池中进行，与上一帧的检测重叠
+        self.preproc_future: Optional[Tuple[Future, float]] = None
+
+        # 帧差门控：画面基本不变时跳过整条流水线，门限按目标帧率自适应
+        self._prev_small: Optional[np.ndarray] = None
+        self.change_threshold = self.config.get("processing.change_threshold", 40)
+        self.target_fps = self.config.get("processing.target_fps", 15)
+        self._last_gate_pass = time.time()
         self.scene_analyzer = SceneAnalyzer(self.config)
         self.narrator = NarrativeEngine(self.config)
 
@@ -114,35 +143,116 @@ class VisionAssistant:
 
     def _process_frame(self, event):
         """处理图像帧的完整流水线"""
-        start_time = time.time()
-        frame = event.data["frame"]
+        frame = event.frame
 
         try:
-            # 阶段1：图像预处理
-            processed_frame = self.preprocessor.process(frame)
+            # 阶段0：帧差门控，与上次处理的帧相比变化很小则不再处理本帧
+            changed = self._frame_changed(frame)
+
+            # 阶段1：图像预处理——取回上一帧的预处理结果，再把本帧提交到后台
+            # （先取回再提交，保证同一时刻只有一帧在预处理）。本帧被门控时
+            # 也要取回上一帧，否则画面静止后最后一个变化帧永远不会被检测和播报
+            previous, self.preproc_future = self.preproc_future, None
+            if changed:
+                self.preproc_future = (
+                    self.executor.submit(self.preprocessor.process, frame), time.time())
+            if previous is not None:
+                preproc_future, start_time = previous
+                self._detect(preproc_future.result(), start_time)
 
-            # 阶段2：物体检测（并行执行）
-            detection_future = self.executor.submit(
-                self.detector.detect, processed_frame)
+        except Exception as e:
+            self._report_pipeline_error(e)
+
+    def _detect(self, processed_frame: np.ndarray, start_time: float):
+        """阶段2：物体检测，随后进入分析与播报"""
+        if self.batcher is None:
+            detection_results = self.detector.detect(processed_frame)
+            self._analyze_and_narrate(processed_frame, detection_results, start_time)
+        else:
+            # 与后续帧合并成批，完成后在检测线程继续后续阶段
+            detection_future = self.batcher.submit(processed_frame)
+            detection_future.add_done_callback(
+                partial(self._on_objects_detected, processed_frame, start_time))
+
+    def _frame_changed(self, frame: np.ndarray) -> bool:
+        """64x36灰度缩略图上统计明显变化的像素数，超过门限才视为新画面（输入为原生BGR帧）"""
+        small = cv2.cvtColor(
+            cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2GRAY).astype(np.int16)
+        if self._prev_small is not None:
+            changed = np.count_nonzero(np.abs(small - self._prev_small) > 15)
+            if changed < self.change_threshold:
+                self._adapt_change_threshold(passed=False)
+                return False
+
+        # 只在放行时更新参考帧，缓慢的累积变化最终也会触发处理
+        self._prev_small = small
+        self._adapt_change_threshold(passed=True)
+        return True
+
+    def _adapt_change_threshold(self, passed: bool):
+        """简单的反馈控制：放行帧率高于目标则提高门限，低于目标则降低
+
+        未放行的帧也参与调节：距上次放行已超过目标帧间隔时逐帧降低门限，
+        否则佩戴者走动时升高的门限在画面静止后不会回落，新出现的物体会一直被挡住。
+        """
+        now = time.time()
+        elapsed = max(now - self._last_gate_pass, 1e-3)
+        if passed:
+            self._last_gate_pass = now
+            if 1.0 / elapsed > self.target_fps:
+                # 上限远小于单个物体在缩略图上的面积（约3%），门限再高也挡不住新出现的物体
+                self.change_threshold = min(self.change_threshold * 1.1, 64 * 36 // 32)
+                return
+        elif elapsed <= 1.0 / self.target_fps:
+            return
+        self.change_threshold = max(self.change_threshold * 0.9, 8)
+
+    def _on_objects_detected(self, processed_frame, start_time: float, detection_future):
+        """批量检测完成回调"""
+        try:
+            detection_results = detection_future.result()
+        except Exception as e:
+            self._report_pipeline_error(e)
+            return
+        self._analyze_and_narrate(processed_frame, detection_results, start_time)
 
+    def _analyze_and_narrate(self, processed_frame, detection_results, start_time: float):
+        """检测之后的分析与播报流程"""
+        try:
             # 阶段3：场景分析（依赖检测结果）
-            detection_results = detection_future.result()
             scene_data = self.scene_analyzer.analyze(detection_results, processed_frame)
 
-            # 阶段4：生成描述
-            narration = self.narrator.generate(scene_data)
+            # 预测到即将出现的风险时提前合成警示语，真正播报时直接命中缓存
+            for risk in scene_data.get("predicted_risks", ()):
+                self.tts.prefetch(self.narrator.alert_text(risk))
+
+            # 阶段4：生成描述。警示语单独播报，与预取的文本一致，可直接命中缓存
+            context = SceneContext(
+                objects=detection_results,
+                scene_type=scene_data["scene_type"],
+                risks=scene_data["potential_risks"]
+            )
+            narration = self.narrator.generate(context)
 
             # 阶段5：语音合成（异步）
-            self.tts.speak(narration, priority=scene_data.get("priority", 1))
+            for alert in self.narrator.alerts(context):
+                self.tts.speak(alert, priority=ALERT_PRIORITY)
+            if narration:
+                self.tts.speak(narration, priority=scene_data.get("priority", 1))
 
             # 性能统计
             self._update_performance_metrics(start_time)
 
         except Exception as e:
-            self.logger.get_logger("Pipeline").error(
-                f"处理流程异常: {str(e)}", exc_info=True)
-            self.event_bus.publish(EventFactory.create_alert_event(
-                "Main", "ERROR", f"处理流程异常: {str(e)}"))
+            self._report_pipeline_error(e)
+
+    def _report_pipeline_error(self, e: Exception):
+        """记录流水线异常并发布警报"""
+        self.logger.get_logger("Pipeline").error(
+            f"处理流程异常: {str(e)}", exc_info=e)
+        self.event_bus.publish(EventFactory.create_alert_event(
+            "Main", "ERROR", f"处理流程异常: {str(e)}"))
 
     def _update_performance_metrics(self, start_time: float):
         """更新性能指标并自适应调整"""
@@ -200,7 +310,7 @@ class VisionAssistant:
             case "电量查询":
                 self._report_battery_status()
             case _:
-                self.tts.speak("无法识别的指令")
+                self.tts.speak("无法识别的指令", priority=COMMAND_PRIORITY)
 
     def _handle_system_alert(self, event):
         """处理系统警报事件"""
@@ -209,33 +319,33 @@ class VisionAssistant:
 
         # 高风险警报立即语音提示
         if event.data["level"] in ["CRITICAL", "HIGH"]:
-            self.tts.speak(alert_msg, priority=0)
+            self.tts.speak(alert_msg, priority=SYSTEM_ALERT_PRIORITY)
 
     def _start_processing(self):
         """启动处理流程"""
         if not self.running:
             self.running = True
             self.camera.start_capturing()
-            self.tts.speak("系统已启动")
+            self.tts.speak("系统已启动", priority=COMMAND_PRIORITY)
 
     def _stop_processing(self):
         """停止处理流程"""
         self.running = False
         self.camera.stop_capturing()
-        self.tts.speak("系统已暂停")
+        self.tts.speak("系统已暂停", priority=COMMAND_PRIORITY)
 
     def _toggle_processing_mode(self):
         """切换处理模式"""
         current_mode = self.config.get("processing.mode", "balanced")
         new_mode = "fast" if current_mode == "quality" else "quality"
         self.config.update("processing.mode", new_mode)
-        self.tts.speak(f"已切换至{new_mode}模式")
+        self.tts.speak(f"已切换至{new_mode}模式", priority=COMMAND_PRIORITY)
 
     def _report_battery_status(self):
         """报告电量状态"""
         # 假设电源管理模块提供电量信息
         battery_level = 75  # 从PowerManager获取
-        self.tts.speak(f"当前电量剩余{battery_level}%")
+        self.tts.speak(f"当前电量剩余{battery_level}%", priority=COMMAND_PRIORITY)
 
     def _monitor_system_status(self):
         """系统健康状态监控"""
@@ -256,6 +366,8 @@ class VisionAssistant:
         self.camera.release()
         self.user_input.stop_listening()
         self.tts.stop()
+        if self.batcher is not None:
+            self.batcher.stop()
         self.executor.shutdown(wait=True)
 
         # 等待资源释放
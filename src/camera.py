@@ -1,24 +1,67 @@
+import threading
+import time
 import cv2
 import numpy as np
 from typing import Optional
 
 class CameraController:
     """多摄像头管理"""
-    def __init__(self, config: ConfigManager):
+    def __init__(self, config: ConfigManager, event_bus=None):
         self.cap = cv2.VideoCapture(config.get("camera.index", 0))
         self.resolution = tuple(config.get("camera.resolution", (1280, 720)))
+        self.fourcc = config.get("camera.fourcc", "MJPG")
+        self.event_bus = event_bus
+        self.capturing = False
+        self._capture_thread: Optional[threading.Thread] = None
         self.set_properties()
 
     def set_properties(self):
+        # 支持时改用MJPEG压缩流，降低USB带宽占用。必须先于分辨率设置：
+        # V4L2下在设好尺寸后再切换格式，常会重置或拒绝所请求的分辨率
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
         self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
 
     def capture_frame(self) -> Optional[np.ndarray]:
+        """返回相机原生的BGR帧；转RGB与预处理合并进行，采集路径不再整帧转换"""
         ret, frame = self.cap.read()
         if ret:
-            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            return frame
         return None
 
+    def is_ready(self) -> bool:
+        return self.cap.isOpened()
+
+    def start_capturing(self):
+        """启动采集线程，逐帧经事件总线的帧对象池发布"""
+        if self.capturing:
+            return
+        self.capturing = True
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop,
+            name="camera-capture",
+            daemon=True
+        )
+        self._capture_thread.start()
+
+    def stop_capturing(self):
+        self.capturing = False
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=1)
+            self._capture_thread = None
+
+    def _capture_loop(self):
+        """采集路径不构造事件对象：publish_frame复用总线对象池中的Event"""
+        while self.capturing:
+            frame = self.capture_frame()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            if self.event_bus is not None:
+                self.event_bus.publish_frame("Camera", frame)
+
     def release(self):
+        self.stop_capturing()
         self.cap.release()
\ No newline at end of file
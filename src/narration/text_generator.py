@@ -1,5 +1,27 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Callable, List, Dict, Tuple
+
+# 多语言模板：alerts为风险 -> 警示语，objects/scene为带槽位的格式串
+_TEMPLATES = {
+    "en": {
+        "alerts": {"moving_vehicle": "Warning: Approaching vehicle detected!"},
+        "objects": "Ahead: {objects}.",
+        "scene": "You are in a {scene_type} area.",
+        "separator": ", ",
+        "joiner": " ",
+    },
+    "zh": {
+        "alerts": {"moving_vehicle": "警告：有车辆正在接近！"},
+        "objects": "前方有{objects}。",
+        "scene": "当前场景：{scene_type}。",
+        "separator": "、",
+        "joiner": "",
+    },
+}
+
+# 详细程度：1 仅警示，2 加上重点物体，3 再加场景概述
+# 警示语作为独立的语句播报（内容固定，可预先合成缓存），generate()只生成其后的描述
+_MAX_VERBOSITY = 3
 
 @dataclass
 class SceneContext:
@@ -12,27 +34,76 @@ class NarrativeEngine:
     def __init__(self, config: ConfigManager):
         self.language = config.get("narration.language", "en")
         self.verbosity = config.get("narration.verbosity", 2)
+        self.max_objects = config.get("narration.max_objects", 3)
         self._load_templates()
 
     def generate(self, context: SceneContext) -> str:
-        critical = self._critical_alerts(context.risks)
-        priority = self._priority_objects(context.objects)
-        summary = self._scene_summary(context.scene_type)
-        return " ".join(filter(None, [critical, priority, summary]))
+        """警示语之外的场景描述（详细程度1时为空）"""
+        return self._renderer(context)
+
+    def alerts(self, context: SceneContext) -> List[str]:
+        """当前风险对应的警示语，每条单独播报"""
+        return [text for risk, text in self._alerts.items() if risk in context.risks]
 
-    def _critical_alerts(self, risks: List[str]) -> str:
-        if "moving_vehicle" in risks:
-            return "Warning: Approaching vehicle detected!"
-        return ""
+    def alert_text(self, risk: str) -> str:
+        """某类风险对应的警示语（当前语言），用于提前预取语音"""
+        return self._alerts.get(risk, "")
 
-    def _priority_objects(self, objects: List[Dict]) -> str:
-        # 根据对象优先级生成描述
-        pass
+    def _priority_objects(self, template: str, separator: str) -> Callable:
+        # 根据对象优先级生成描述：框面积越大（越近）越靠前，同类只播报一次
+        fmt = template.format
+        join = separator.join
+        limit = self.max_objects
 
-    def _scene_summary(self, scene_type: str) -> str:
+        def render(context: SceneContext) -> str:
+            names = []
+            for obj in sorted(context.objects, key=_bbox_area, reverse=True):
+                if obj["class"] not in names:
+                    names.append(obj["class"])
+                    if len(names) == limit:
+                        break
+            return fmt(objects=join(names)) if names else ""
+        return render
+
+    def _scene_summary(self, template: str) -> Callable:
         # 场景类型描述
-        pass
+        fmt = template.format
+
+        def render(context: SceneContext) -> str:
+            if not context.scene_type or context.scene_type == "unknown":
+                return ""
+            return fmt(scene_type=context.scene_type)
+        return render
 
     def _load_templates(self):
-        # 加载多语言模板
-        pass
\ No newline at end of file
+        # 加载多语言模板，按 (语言, 详细程度) 预先特化为渲染函数，
+        # 逐帧生成时只需一次调用，无需再判断层级或解析模板
+        self._render: Dict[Tuple[str, int], Callable[[SceneContext], str]] = {}
+        for language, template in _TEMPLATES.items():
+            # 第1层（警示）由alerts()单独给出，这里只组合其后的层级
+            sections = [
+                self._priority_objects(template["objects"], template["separator"]),
+                self._scene_summary(template["scene"]),
+            ]
+            for verbosity in range(1, _MAX_VERBOSITY + 1):
+                self._render[(language, verbosity)] = _compose(
+                    tuple(sections[:verbosity - 1]), template["joiner"])
+
+        language = self.language if self.language in _TEMPLATES else "en"
+        verbosity = min(max(self.verbosity, 1), _MAX_VERBOSITY)
+        self._renderer = self._render[(language, verbosity)]
+        self._alerts = _TEMPLATES[language]["alerts"]
+
+
+def _bbox_area(obj: Dict) -> float:
+    x1, y1, x2, y2 = obj["bbox"][:4]
+    return (x2 - x1) * (y2 - y1)
+
+
+def _compose(sections: Tuple[Callable, ...], joiner: str) -> Callable[[SceneContext], str]:
+    """把各层级的渲染函数拼接为一个渲染函数"""
+    join = joiner.join
+
+    def render(context: SceneContext) -> str:
+        return join([text for text in (section(context) for section in sections) if text])
+    return render
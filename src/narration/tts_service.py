@@ -1,14 +1,39 @@
 import os
+import json
+import hashlib
 import queue
+import itertools
 import threading
 import time
 import sounddevice as sd
 import numpy as np
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from collections import OrderedDict
 from dataclasses import dataclass
 from .text_generator import SceneContext  # 依赖文本生成模块
 
+# WAV整型采样归一化到[-1, 1]的倒数缩放系数，按dtype预先算好，转换时只做一次乘法
+_INV_SCALE = {
+    np.dtype(np.int16): np.float32(1.0 / 32767.0),
+    np.dtype(np.int32): np.float32(1.0 / 2147483647.0),
+}
+
+# 打包缓存每新增多少条写一次磁盘索引，其余在stop()时写入；中途退出只丢失未写入的条目
+PACK_INDEX_SAVE_EVERY = 16
+
+# 高优先级且内容固定的常用播报语，启动时预先合成进缓存，首次播报即可命中
+PREFETCH_PHRASES: List[str] = [
+    "Warning: Approaching vehicle detected!",
+    "警告：有车辆正在接近！",
+    "前方三米检测到行人，建议减速",
+    "系统已启动",
+    "系统已暂停",
+    "无法识别的指令",
+]
+
 
 @dataclass
 class VoiceProfile:
@@ -25,9 +50,17 @@ class TTSService:
     def __init__(self, config_manager):
         self.config = config_manager
         self.profile = self._load_voice_profile()
-        self.audio_queue = queue.Queue(maxsize=10)  # 缓冲队列
+        # 播放队列（堆），元素为 (-优先级, 序号, 音频)：数值大的先播，同级按提交顺序
+        self.audio_queue = queue.PriorityQueue(maxsize=10)
+        self._enqueue_seq = itertools.count()
         self.cache_dir = "audio_cache"
+        self._init_cache()
+        self.http = self._init_http_session()
         self.running = True
+        self.synth_pool = ThreadPoolExecutor(
+            max_workers=self.config.get("tts.synth_workers", 2),
+            thread_name_prefix="tts-synth"
+        )
         self._init_audio_device()
         self._start_consumer_thread()
 
@@ -35,6 +68,12 @@ class TTSService:
         self.online_enabled = self.config.get("tts.use_online", True)
         self.offline_engine = self._init_offline_engine()
 
+        # 预取常用播报语
+        self._prefetching = set()
+        if self.config.get("tts.prefetch_enabled", True):
+            for phrase in PREFETCH_PHRASES:
+                self.prefetch(phrase)
+
     def _load_voice_profile(self) -> VoiceProfile:
         """从配置加载语音参数"""
         return VoiceProfile(
@@ -60,6 +99,18 @@ class TTSService:
             print(f"Audio device error: {e}")
             raise
 
+    def _init_http_session(self) -> requests.Session:
+        """在线合成复用的HTTP会话，keep-alive连接池避免每次请求重新握手"""
+        pool_size = self.config.get("tts.synth_workers", 2)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        api_key = self.config.get("apis.sensevoice.key")
+        if api_key:
+            session.headers.update({"Authorization": f"Bearer {api_key}"})
+        return session
+
     def _init_offline_engine(self):
         """加载本地TTS引擎"""
         try:
@@ -78,24 +129,33 @@ class TTSService:
         self.consumer_thread.start()
 
     def speak(self, text: str, priority: int = 0):
-        """提交文本到合成队列（优先级机制）"""
+        """提交文本到合成队列（优先级机制：数值越大越先播放）"""
         if not text.strip():
             return
 
         # 检查缓存
         audio_data = self._check_cache(text)
         if audio_data is not None:
-            self.audio_queue.put((audio_data, priority))
+            self._enqueue_audio(audio_data, priority)
             return
 
-        # 提交合成任务
-        threading.Thread(
-            target=self._synthesize_task,
-            args=(text, priority),
-            daemon=True
-        ).start()
+        # 提交合成任务（复用常驻线程池，避免每次创建线程）
+        self.synth_pool.submit(self._synthesize_task, text, priority)
 
-    def _synthesize_task(self, text: str, priority: int):
+    def prefetch(self, text: str):
+        """只合成并写入缓存，不播放；已缓存或正在预取的文本直接跳过"""
+        if not text.strip():
+            return
+        with self._cache_lock:
+            if text in self._prefetching:
+                return
+            self._prefetching.add(text)
+        if self._check_cache(text) is not None:
+            self._prefetching.discard(text)
+            return
+        self.synth_pool.submit(self._synthesize_task, text, 0, False)
+
+    def _synthesize_task(self, text: str, priority: int, play: bool = True):
         """合成任务处理线程"""
         try:
             # 优先使用在线引擎
@@ -106,20 +166,19 @@ class TTSService:
 
             if audio is not None:
                 self._add_to_cache(text, audio)
-                self.audio_queue.put((audio, priority))
+                if play:
+                    self._enqueue_audio(audio, priority)
         except Exception as e:
             print(f"TTS synthesis failed: {e}")
+        finally:
+            if not play:
+                self._prefetching.discard(text)
 
     def _online_synthesis(self, text: str) -> Optional[np.ndarray]:
         """SenseVoice在线合成"""
-        api_key = self.config.get("apis.sensevoice.key")
-        if not api_key:
+        if "Authorization" not in self.http.headers:
             return None
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
         payload = {
             "text": text,
             "voice": self.profile.voice_id,
@@ -130,10 +189,9 @@ class TTSService:
         }
 
         try:
-            response = requests.post(
+            response = self.http.post(
                 "https://api.sensevoice.ai/v1/synthesize",
                 json=payload,
-                headers=headers,
                 timeout=5
             )
             response.raise_for_status()
@@ -148,15 +206,13 @@ class TTSService:
             return None
 
         try:
-            # 使用本地TTS引擎生成
-            output_path = "temp_audio.wav"
-            self.offline_engine.tts_to_file(
+            # 使用本地TTS引擎在内存中生成（返回[-1, 1]浮点采样），不经临时文件，
+            # 多个合成线程可并发调用
+            wav = self.offline_engine.tts(
                 text=text,
-                speaker=self.profile.voice_id,
-                file_path=output_path
+                speaker=self.profile.voice_id
             )
-            with open(output_path, "rb") as f:
-                return self._convert_audio(f.read())
+            return np.asarray(wav, dtype=np.float32)
         except Exception as e:
             print(f"Offline TTS failed: {e}")
             return None
@@ -168,54 +224,183 @@ class TTSService:
 
         buffer = io.BytesIO(data)
         rate, audio = wavfile.read(buffer)
-        audio = audio.astype(np.float32) / np.iinfo(audio.dtype).max
-        return audio
+        if audio.dtype == np.float32:
+            return audio
+        if audio.dtype == np.uint8:  # 8位WAV为无符号，以128为零点
+            return np.multiply(audio, np.float32(1.0 / 128.0), dtype=np.float32) - np.float32(1.0)
+        # 类型转换与缩放在一次遍历中完成
+        return np.multiply(audio, _INV_SCALE[audio.dtype], dtype=np.float32)
+
+    def _enqueue_audio(self, audio: np.ndarray, priority: int):
+        self.audio_queue.put((-priority, next(self._enqueue_seq), audio))
 
     def _audio_consumer(self):
         """音频播放线程"""
         while self.running:
             try:
-                # 按优先级排序播放
-                items = []
-                while not self.audio_queue.empty():
-                    items.append(self.audio_queue.get())
+                # 阻塞等待，每次取出当前优先级最高的一条
+                _, _, audio = self.audio_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
 
-                # 排序：高优先级先播放
-                items.sort(key=lambda x: -x[1])
-
-                for audio, _ in items:
-                    sd.play(audio, samplerate=24000)
-                    sd.wait()
+            try:
+                sd.play(audio, samplerate=24000)
+                sd.wait()
             except Exception as e:
                 print(f"Audio playback error: {e}")
-            time.sleep(0.1)
+
+    def _init_cache(self):
+        """内存LRU（按字节预算淘汰）+ 单文件打包的磁盘缓存"""
+        self.mem_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.cache_bytes = 0
+        self.cache_bytes_budget = int(self.config.get("tts.cache_mb", 128)) << 20
+        self._cache_lock = threading.Lock()
+
+        # 所有音频量化为int16后顺序追加到打包文件，索引记录 键 -> [偏移, 帧数, 声道数]
+        self._pack_path = os.path.join(self.cache_dir, "pack_int16.bin")
+        self._index_path = os.path.join(self.cache_dir, "index_int16.json")
+        self._pack = None  # 打包文件的只读内存映射，文件增长后重新映射
+        self.pack_bytes_budget = int(self.config.get("tts.pack_mb", 256)) << 20
+        # 串行化磁盘写入（追加、压缩、写索引）；查缓存只持有_cache_lock，不会等待磁盘I/O
+        self._pack_lock = threading.Lock()
+        self._unsaved_entries = 0
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self._pack_index = json.load(f)
+        except (OSError, ValueError):
+            self._pack_index = {}
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        """稳定的缓存键：内置hash()按进程随机化，重启后磁盘缓存将无法命中"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
 
     def _check_cache(self, text: str) -> Optional[np.ndarray]:
         """检查音频缓存"""
         if not self.config.get("tts.cache_enabled", True):
             return None
 
-        cache_file = os.path.join(
-            self.cache_dir,
-            f"{hash(text)}.npy"
-        )
-        if os.path.exists(cache_file):
+        key = self._cache_key(text)
+        with self._cache_lock:
+            audio = self.mem_cache.get(key)
+            if audio is not None:
+                self.mem_cache.move_to_end(key)
+                return audio
+
+            audio = self._read_pack(key)
+            if audio is not None:
+                self._remember(key, audio)
+            return audio
+
+    def _read_pack(self, key: str) -> Optional[np.ndarray]:
+        """从内存映射的打包文件中零拷贝切出一段音频"""
+        entry = self._pack_index.get(key)
+        if entry is None:
+            return None
+
+        offset, frames, channels = entry
+        end = offset + frames * channels
+        if self._pack is None or self._pack.shape[0] < end:
             try:
-                return np.load(cache_file)
-            except:
+                self._pack = np.memmap(self._pack_path, dtype=np.int16, mode="r")
+            except (OSError, ValueError):
+                return None
+            if self._pack.shape[0] < end:
                 return None
-        return None
 
-    def _add_to_cache(self, text: str, audio: np.ndarray):
-        """添加音频到缓存"""
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
+        audio = self._pack[offset:end]
+        return audio.reshape(frames, channels) if channels > 1 else audio
 
-        cache_file = os.path.join(
-            self.cache_dir,
-            f"{hash(text)}.npy"
-        )
-        np.save(cache_file, audio)
+    def _remember(self, key: str, audio: np.ndarray):
+        """放入内存LRU，超出字节预算时从最久未用的一端淘汰"""
+        self.mem_cache[key] = audio
+        self.cache_bytes += audio.nbytes
+        while self.cache_bytes > self.cache_bytes_budget and len(self.mem_cache) > 1:
+            _, evicted = self.mem_cache.popitem(last=False)
+            self.cache_bytes -= evicted.nbytes
+
+    def _add_to_cache(self, text: str, audio: np.ndarray):
+        """添加音频到缓存（量化为int16，内存与磁盘占用减半，sounddevice可直接播放）
+
+        内存缓存立即可用；磁盘写入只在_pack_lock内进行，索引在条目写完后才登记。
+        """
+        key = self._cache_key(text)
+        audio = np.clip(np.rint(audio * 32767.0), -32768, 32767).astype(np.int16)
+        with self._cache_lock:
+            if key not in self.mem_cache:
+                self._remember(key, audio)
+            if key in self._pack_index:
+                return
+
+        with self._pack_lock:
+            if key in self._pack_index:  # 其他合成线程已写入
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                pack_bytes = os.path.getsize(self._pack_path)
+            except OSError:
+                pack_bytes = 0
+            if pack_bytes + audio.nbytes > self.pack_bytes_budget:
+                self._compact_pack()
+
+            with open(self._pack_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END) // audio.itemsize
+                f.write(audio.tobytes())
+            channels = 1 if audio.ndim == 1 else audio.shape[1]
+            with self._cache_lock:
+                self._pack_index[key] = [offset, audio.shape[0], channels]
+
+            self._unsaved_entries += 1
+            if self._unsaved_entries >= PACK_INDEX_SAVE_EVERY:
+                self._save_pack_index()
+
+    def _compact_pack(self):
+        """持有_pack_lock时调用：打包文件超出预算时重写，降到预算的一半
+
+        优先保留内存缓存中最近用过的条目，其余按追加先后从新到旧保留；
+        不在索引中的残留数据一并清除。
+        """
+        with self._cache_lock:
+            index = dict(self._pack_index)
+            recent = [key for key in reversed(self.mem_cache) if key in index]
+        older = sorted(index.keys() - set(recent), key=lambda k: index[k][0], reverse=True)
+
+        kept = {}
+        size = 0
+        budget = self.pack_bytes_budget // 2 // np.dtype(np.int16).itemsize
+        tmp_path = self._pack_path + ".tmp"
+        pack = np.memmap(self._pack_path, dtype=np.int16, mode="r") if index else None
+        with open(tmp_path, "wb") as f:
+            for key in recent + older:
+                offset, frames, channels = index[key]
+                count = frames * channels
+                if size + count > budget:
+                    continue
+                f.write(pack[offset:offset + count].tobytes())
+                kept[key] = [size, frames, channels]
+                size += count
+        del pack
+
+        # 先删除旧索引再替换打包文件，中途退出只会丢失缓存，不会让索引与数据错配
+        try:
+            os.remove(self._index_path)
+        except FileNotFoundError:
+            pass
+        with self._cache_lock:
+            os.replace(tmp_path, self._pack_path)
+            self._pack_index = kept
+            self._pack = None
+        self._save_pack_index()
+
+    def _save_pack_index(self):
+        """持有_pack_lock时调用：先写临时文件再替换，避免中途退出留下损坏的索引"""
+        with self._cache_lock:
+            snapshot = dict(self._pack_index)
+        self._unsaved_entries = 0
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self._index_path)
 
     def update_profile(self, new_profile: Dict[str, Any]):
         """动态更新语音参数"""
@@ -229,6 +414,11 @@ class TTSService:
     def stop(self):
         """停止服务"""
         self.running = False
+        self.synth_pool.shutdown(wait=False, cancel_futures=True)
+        with self._pack_lock:
+            if self._unsaved_entries:
+                self._save_pack_index()
+        self.http.close()
         sd.stop()
         self.consumer_thread.join(timeout=1)
 
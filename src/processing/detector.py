@@ -1,28 +1,163 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import cv2
+import numpy as np
 from ultralytics import YOLO
 import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# 导出格式对应的模型文件后缀（engine为TensorRT，支持INT8量化）
+EXPORT_SUFFIX = {"onnx": ".onnx", "engine": ".engine", "openvino": "_openvino_model"}
+
+detector_logger = logging.getLogger("Detector")
 
 
 class HybridDetector:
     """混合检测系统"""
 
     def __init__(self, config: ConfigManager):
-        self.local_model = YOLO(config.get("models.yolo_path"))
+        # 头戴相机分辨率固定，导出静态输入形状的ONNX/TensorRT模型，推理时省去动态形状推断。
+        # 按1、2、4…直到max_batch各导出一份，每次选能装下请求的最小批，补齐的空帧不超过一半
+        self.imgsz = tuple(config.get("detector.imgsz", (384, 640)))
+        self.batch_models: Dict[int, YOLO] = {}  # 批大小 -> 对应的导出模型，为空时直接用PyTorch模型
+        self.local_model = self._load_model(
+            config.get("models.yolo_path"),
+            config.get("detector.export_format", "onnx"),
+            config.get("detector.int8", False),
+            max(config.get("detector.max_batch", 4), 1)
+        )
+        self.batch_sizes = sorted(self.batch_models)
+        # 场景分析的运动速度、碰撞预测都依赖跨帧稳定的跟踪ID，只有track()才会给出
+        self.tracking = config.get("detector.tracking", True)
         self.api_key = config.get("apis.deepseek.key")
         self.use_cloud = config.get("models.use_cloud", False)
 
+        # 感知哈希结果缓存：头戴相机相邻帧高度重叠，画面几乎不变时复用检测结果
+        self.cache: "OrderedDict[int, List[Dict]]" = OrderedDict()
+        self.cache_size = config.get("detector.cache_size", 32)
+        self.hash_threshold = config.get("detector.hash_threshold", 6)
+        self._base_threshold = self.hash_threshold
+        self._change_rate = 0.0  # 帧间哈希距离的滑动平均
+        self.last_phash: Optional[int] = None
+        self.last_results: List[Dict] = []
+
     def detect(self, image: np.ndarray) -> List[Dict]:
-        # 本地快速检测
-        local_results = self._local_detection(image)
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        """批量检测：先按感知哈希复用结果，其余帧合并为一次推理"""
+        results: List[Optional[List[Dict]]] = [None] * len(images)
+        pending = []  # 需要真正推理的 (序号, 哈希)
+        for i, image in enumerate(images):
+            phash = self._dhash(image)
+            results[i] = self._lookup(phash)
+            if results[i] is None:
+                pending.append((i, phash))
+
+        if pending:
+            # 本地快速检测
+            local_results = self._local_detection([images[i] for i, _ in pending])
+            for (i, phash), detections in zip(pending, local_results):
+                if self.use_cloud:
+                    cloud_results = self._cloud_analysis(images[i])
+                    detections = self._merge_results(detections, cloud_results)
+                self._store(phash, detections)
+                results[i] = detections
+        return results
+
+    def _lookup(self, phash: int) -> Optional[List[Dict]]:
+        """与上次检测的帧足够相似，或哈希完全命中缓存时返回已有结果"""
+        if self.last_phash is not None:
+            distance = (phash ^ self.last_phash).bit_count()
+            self._adapt_threshold(distance)
+            if distance < self.hash_threshold:
+                return self.last_results
+
+        results = self.cache.get(phash)
+        if results is not None:
+            self.cache.move_to_end(phash)
+            self.last_phash, self.last_results = phash, results
+        return results
+
+    def _store(self, phash: int, results: List[Dict]):
+        self.cache[phash] = results
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        self.last_phash, self.last_results = phash, results
+
+    @staticmethod
+    def _dhash(image: np.ndarray) -> int:
+        """64位差分哈希：9x8灰度缩略图中相邻像素的明暗关系"""
+        small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        return int.from_bytes(np.packbits(gray[:, 1:] > gray[:, :-1]).tobytes(), "big")
+
+    def _adapt_threshold(self, distance: int):
+        """场景变化越频繁，复用门限越严格，避免在快速运动时沿用过期结果"""
+        self._change_rate = 0.9 * self._change_rate + 0.1 * distance
+        self.hash_threshold = max(1, self._base_threshold - int(self._change_rate // 8))
+
+    def _load_model(self, weights: str, export_format: Optional[str], int8: bool,
+                    max_batch: int) -> YOLO:
+        """加载各批大小的固定输入形状导出模型，首次运行时导出，失败则只用PyTorch权重"""
+        model = YOLO(weights)
+        if not export_format:
+            return model
+
+        sizes = {max_batch}
+        size = 1
+        while size < max_batch:
+            sizes.add(size)
+            size *= 2
+
+        stem = os.path.splitext(weights)[0]
+        try:
+            for size in sorted(sizes):
+                exported = f"{stem}_b{size}{EXPORT_SUFFIX[export_format]}"
+                if not os.path.exists(exported):
+                    # 导出路径固定为权重同名文件，按批大小另存，避免互相覆盖
+                    os.replace(model.export(
+                        format=export_format, imgsz=self.imgsz, batch=size,
+                        dynamic=False, simplify=True, int8=int8
+                    ), exported)
+                self.batch_models[size] = YOLO(exported, task="detect")
+        except Exception as e:
+            detector_logger.warning(f"Model export failed, using PyTorch weights: {e}")
+            self.batch_models.clear()
+        return model
 
-        if self.use_cloud:
-            cloud_results = self._cloud_analysis(image)
-            return self._merge_results(local_results, cloud_results)
-        return local_results
+    def _local_detection(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        if self.tracking:
+            # 跟踪器有状态，需按顺序逐帧看到每一帧；补齐的重复帧会破坏其运动估计，因此不合批
+            model = self.batch_models.get(1, self.local_model)
+            return [
+                self._parse_yolo_results(
+                    model.track(image, persist=True, imgsz=self.imgsz, verbose=False)[0])
+                for image in images
+            ]
 
-    def _local_detection(self, image: np.ndarray):
-        results = self.local_model.predict(image)
-        return self._parse_yolo_results(results)
+        if not self.batch_models:
+            results = self.local_model.predict(images, verbose=False)
+            return [self._parse_yolo_results(r) for r in results]
+
+        # 静态批大小：选能装下剩余帧的最小批（都装不下时用最大批），
+        # 不足的部分用末帧补齐，补齐部分的结果丢弃
+        parsed = []
+        start = 0
+        while start < len(images):
+            remaining = len(images) - start
+            size = next((s for s in self.batch_sizes if s >= remaining), self.batch_sizes[-1])
+            chunk = images[start:start + size]
+            padded = chunk + [chunk[-1]] * (size - len(chunk))
+            results = self.batch_models[size].predict(padded, imgsz=self.imgsz, verbose=False)
+            parsed.extend(self._parse_yolo_results(r) for r in results[:len(chunk)])
+            start += size
+        return parsed
 
     def _cloud_analysis(self, image: np.ndarray):
         # 调用DeepSeek API
@@ -35,6 +170,87 @@ class HybridDetector:
         )
         return response.json()
 
-    def _parse_yolo_results(self, results):
-        # 解析YOLO输出格式
-        pass
\ No newline at end of file
+    def _parse_yolo_results(self, result) -> List[Dict]:
+        """解析单帧YOLO输出为检测字典列表"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+
+        xyxy = boxes.xyxy.cpu().numpy()
+        classes = boxes.cls.cpu().numpy().astype(int)
+        scores = boxes.conf.cpu().numpy()
+        objects = [
+            {"class": result.names[cls], "bbox": box.tolist(),
+             "confidence": float(score), "attributes": {}}
+            for cls, box, score in zip(classes, xyxy, scores)
+        ]
+        # 只有启用跟踪时才有跨帧稳定的ID；框序号不能当作ID，否则会把不同物体接到同一条轨迹上
+        if boxes.id is not None:
+            for obj, obj_id in zip(objects, boxes.id.cpu().numpy().astype(int)):
+                obj["id"] = int(obj_id)
+        return objects
+
+
+class BatchingDetector:
+    """批量检测调度：在短暂的合并窗口内攒批，一次推理后按帧回填Future"""
+
+    def __init__(self, detector: HybridDetector, config):
+        self.detector = detector
+        self.max_batch = config.get("detector.max_batch", 4)
+        self.coalesce_s = config.get("detector.coalesce_ms", 10) / 1000
+        self._queue = queue.Queue(maxsize=self.max_batch)
+        self.running = True
+        self._worker = threading.Thread(
+            target=self._batch_loop,
+            name="detector-batch",
+            daemon=True
+        )
+        self._worker.start()
+
+    @property
+    def frames_in_flight(self) -> int:
+        """同时被引用的最大帧数（排队中 + 正在推理的批次）"""
+        return 2 * self.max_batch
+
+    def submit(self, image: np.ndarray) -> Future:
+        """提交一帧待检测，队列满时阻塞形成背压"""
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def _batch_loop(self):
+        """检测线程：取到首帧后在合并窗口内继续收集，凑满或超时即推理"""
+        while self.running:
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.coalesce_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.detector.detect_batch([image for image, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        # 完成回调在本线程按帧序执行
+        for (_, future), detections in zip(batch, results):
+            future.set_result(detections)
+
+    def stop(self):
+        """停止检测线程"""
+        self.running = False
+        self._worker.join(timeout=1)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+from numba import cuda
+
+THREADS_PER_BLOCK = (16, 16)
+
+
+def is_available() -> bool:
+    """是否存在可用的CUDA设备"""
+    return cuda.is_available()
+
+
+@cuda.jit(device=True, inline=True)
+def _clamp_u8(v):
+    return np.uint8(min(max(v + 0.5, 0.0), 255.0))
+
+
+@cuda.jit
+def gaussian_blur_kernel(d_in, d_out):
+    """3x3高斯去噪，每个线程处理一个像素"""
+    x, y = cuda.grid(2)
+    h, w = d_in.shape[0], d_in.shape[1]
+    if x >= w or y >= h:
+        return
+
+    y0, y1 = max(y - 1, 0), min(y + 1, h - 1)
+    x0, x1 = max(x - 1, 0), min(x + 1, w - 1)
+    for k in range(3):
+        top = float(d_in[y0, x0, k]) + 2.0 * d_in[y0, x, k] + d_in[y0, x1, k]
+        mid = float(d_in[y, x0, k]) + 2.0 * d_in[y, x, k] + d_in[y, x1, k]
+        bot = float(d_in[y1, x0, k]) + 2.0 * d_in[y1, x, k] + d_in[y1, x1, k]
+        d_out[y, x, k] = _clamp_u8((top + 2.0 * mid + bot) / 16.0)
+
+
+@cuda.jit
+def clahe_apply_kernel(d_in, d_luts, d_gains, d_out):
+    """亮度分块LUT双线性查表并叠加白平衡增益，同时把BGR输入重排为RGB输出"""
+    x, y = cuda.grid(2)
+    h, w = d_in.shape[0], d_in.shape[1]
+    if x >= w or y >= h:
+        return
+
+    tiles_y, tiles_x = d_luts.shape[0], d_luts.shape[1]
+    fy = (y + 0.5) * tiles_y / h - 0.5
+    ty0 = min(max(int(math.floor(fy)), 0), tiles_y - 1)
+    ty1 = min(ty0 + 1, tiles_y - 1)
+    wy = min(max(fy - ty0, 0.0), 1.0)
+    fx = (x + 0.5) * tiles_x / w - 0.5
+    tx0 = min(max(int(math.floor(fx)), 0), tiles_x - 1)
+    tx1 = min(tx0 + 1, tiles_x - 1)
+    wx = min(max(fx - tx0, 0.0), 1.0)
+
+    b = float(d_in[y, x, 0])
+    g = float(d_in[y, x, 1])
+    r = float(d_in[y, x, 2])
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    li = min(int(luma + 0.5), 255)
+    top = (1.0 - wx) * d_luts[ty0, tx0, li] + wx * d_luts[ty0, tx1, li]
+    bot = (1.0 - wx) * d_luts[ty1, tx0, li] + wx * d_luts[ty1, tx1, li]
+    scale = ((1.0 - wy) * top + wy * bot) / max(luma, 1.0)
+
+    d_out[y, x, 0] = _clamp_u8(r * scale * d_gains[0])
+    d_out[y, x, 1] = _clamp_u8(g * scale * d_gains[1])
+    d_out[y, x, 2] = _clamp_u8(b * scale * d_gains[2])
+
+
+class GpuPreprocessor:
+    """CUDA预处理：帧常驻显存，上传/计算/下载在独立的流上执行"""
+
+    def __init__(self, height: int, width: int, tile_grid=(8, 8)):
+        self.stream = cuda.stream()
+        self.d_luts = cuda.device_array(tuple(tile_grid) + (256,), np.float32)
+        self.d_gains = cuda.to_device(np.ones(3, np.float32), stream=self.stream)
+        self._allocate((height, width, 3))
+
+    def _allocate(self, shape):
+        """按分辨率分配页锁定输入缓冲与显存缓冲"""
+        self.shape = shape
+        self.h_in = cuda.pinned_array(shape, np.uint8)
+        self.d_in = cuda.device_array(shape, np.uint8)
+        self.d_tmp = cuda.device_array(shape, np.uint8)
+        self.d_out = cuda.device_array(shape, np.uint8)
+        self.blocks = (
+            (shape[1] + THREADS_PER_BLOCK[0] - 1) // THREADS_PER_BLOCK[0],
+            (shape[0] + THREADS_PER_BLOCK[1] - 1) // THREADS_PER_BLOCK[1]
+        )
+
+    @staticmethod
+    def pinned_buffer(shape) -> np.ndarray:
+        """分配页锁定主机内存，用作异步回传的目标"""
+        return cuda.pinned_array(shape, np.uint8)
+
+    def update_statistics(self, luts: np.ndarray, gains: np.ndarray):
+        """上传新的CLAHE分块LUT与白平衡增益"""
+        self.d_luts.copy_to_device(luts, stream=self.stream)
+        self.d_gains.copy_to_device(gains, stream=self.stream)
+
+    def process(self, frame: np.ndarray, out: np.ndarray) -> np.ndarray:
+        if frame.shape != self.shape:
+            self._allocate(frame.shape)
+
+        # 经页锁定内存上传，DMA拷贝与内核在同一条流上排队
+        self.h_in[...] = frame
+        self.d_in.copy_to_device(self.h_in, stream=self.stream)
+        gaussian_blur_kernel[self.blocks, THREADS_PER_BLOCK, self.stream](
+            self.d_in, self.d_tmp)
+        clahe_apply_kernel[self.blocks, THREADS_PER_BLOCK, self.stream](
+            self.d_tmp, self.d_luts, self.d_gains, self.d_out)
+        self.d_out.copy_to_host(out, stream=self.stream)
+        self.stream.synchronize()
+        return out
@@ -1,30 +1,109 @@
 import cv2
 import numpy as np
+from typing import Optional
+
+try:
+    from .kernels import fused_preprocess, clahe_tile_luts
+except ImportError:  # 未安装numba时退回OpenCV分阶段实现
+    fused_preprocess = clahe_tile_luts = None
+
+try:
+    from . import gpu_preprocess
+except ImportError:
+    gpu_preprocess = None
 
 class ImagePreprocessor:
-    """图像预处理流水线"""
-    def __init__(self, config: ConfigManager):
-        self.denoise_strength = config.get("processing.denoise", 3)
+    """图像预处理流水线：输入相机原生BGR帧，输出RGB帧"""
+    def __init__(self, config: ConfigManager, buffer_count: Optional[int] = None):
+        self.clahe_clip = config.get("processing.clahe_clip", 2.0)
+        self.tile_grid = (8, 8)
         self.clahe = cv2.createCLAHE(
-            clipLimit=config.get("processing.clahe_clip", 2.0),
-            tileGridSize=(8,8)
+            clipLimit=self.clahe_clip,
+            tileGridSize=self.tile_grid
         )
 
+        # CLAHE分块LUT与白平衡增益不是逐像素运算，每N帧在缩略图上重算一次
+        self.stats_interval = config.get("processing.stats_interval", 10)
+        self._luts = np.empty(self.tile_grid + (256,), np.float32)
+        self._gains = np.ones(3, np.float32)
+        self._frame_count = 0
+
+        # 有CUDA设备时走GPU内核链，输出缓冲改用页锁定内存
+        width, height = config.get("camera.resolution", (1280, 720))
+        self.gpu = None
+        self._alloc = lambda shape: np.empty(shape, np.uint8)
+        if (config.get("processing.use_gpu", True)
+                and gpu_preprocess is not None and gpu_preprocess.is_available()):
+            self.gpu = gpu_preprocess.GpuPreprocessor(height, width, self.tile_grid)
+            self._alloc = self.gpu.pinned_buffer
+
+        # 预分配输出缓冲，轮流使用，避免逐帧分配；数量需覆盖下游同时引用的帧数
+        if buffer_count is None:
+            buffer_count = config.get("processing.buffer_count", 2)
+        self._buffers = [self._alloc((height, width, 3))
+                         for _ in range(buffer_count)]
+        self._buffer_index = 0
+
+        # OpenCV后备路径的LAB/L通道缓冲，首帧按分辨率分配
+        self._lab = None
+        self._l = None
+
     def process(self, image: np.ndarray) -> np.ndarray:
-        img = self._denoise(image)
-        img = self._enhance_contrast(img)
-        return self._white_balance(img)
+        if fused_preprocess is None:
+            img = self._denoise(image)
+            img = self._enhance_contrast(img)
+            return self._white_balance(img)
+
+        image = np.ascontiguousarray(image)
+        if self._frame_count % self.stats_interval == 0:
+            self._refresh_statistics(image)
+        self._frame_count += 1
+
+        out = self._next_buffer(image.shape)
+        if self.gpu is not None:
+            return self.gpu.process(image, out)
+        fused_preprocess(image, self._luts, self._gains, out)
+        return out
+
+    def _refresh_statistics(self, img: np.ndarray):
+        """在1/4缩略图上更新CLAHE分块LUT和灰度世界白平衡增益"""
+        small = cv2.resize(img, (img.shape[1] // 4, img.shape[0] // 4),
+                           interpolation=cv2.INTER_AREA)
+        luma = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        clahe_tile_luts(luma, np.float32(self.clahe_clip), self._luts)
+        # 缩略图是BGR顺序，增益翻转为RGB顺序与输出通道对应
+        self._gains = np.ascontiguousarray(self._gray_world_gains(small)[::-1])
+        if self.gpu is not None:
+            self.gpu.update_statistics(self._luts, self._gains)
+
+    @staticmethod
+    def _gray_world_gains(img: np.ndarray) -> np.ndarray:
+        means = img.reshape(-1, 3).mean(axis=0)
+        return (means.mean() / np.maximum(means, 1.0)).astype(np.float32)
+
+    def _next_buffer(self, shape) -> np.ndarray:
+        """取下一个输出缓冲，分辨率变化时重新分配"""
+        self._buffer_index = (self._buffer_index + 1) % len(self._buffers)
+        buf = self._buffers[self._buffer_index]
+        if buf.shape != shape:
+            buf = self._alloc(shape)
+            self._buffers[self._buffer_index] = buf
+        return buf
 
     def _denoise(self, img: np.ndarray) -> np.ndarray:
-        return cv2.fastNlMeansDenoisingColored(img, None,
-            self.denoise_strength, self.denoise_strength, 7, 21)
+        return cv2.GaussianBlur(img, (3, 3), 0)
 
     def _enhance_contrast(self, img: np.ndarray) -> np.ndarray:
-        lab = cv2.cvtColor(img, cv2.COLOR_RGB2LAB)
-        l, a, b = cv2.split(lab)
-        l = self.clahe.apply(l)
-        return cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2RGB)
+        # 只对L通道做CLAHE：转换结果写入预分配的LAB缓冲，L通道拷出一份连续数组
+        # 处理后写回，不再split/merge出三个通道和一张新图；BGR→RGB在两次颜色空间转换中顺带完成
+        if self._lab is None or self._lab.shape != img.shape:
+            self._lab = np.empty_like(img)
+            self._l = np.empty(img.shape[:2], np.uint8)
+        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB, dst=self._lab)
+        np.copyto(self._l, lab[:, :, 0])
+        lab[:, :, 0] = self.clahe.apply(self._l)
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
 
     def _white_balance(self, img: np.ndarray) -> np.ndarray:
-        # 自定义白平衡算法
-        pass
\ No newline at end of file
+        gains = self._gray_world_gains(img)
+        return np.clip(img * gains, 0, 255).astype(np.uint8)
@@ -1,18 +1,88 @@
 import numpy as np
-from typing import List, Dict, Tuple, Deque
-from collections import deque, defaultdict
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
 import time
 
-
-@dataclass
-class ObjectTrack:
-    """物体跟踪数据"""
-    id: int
-    cls: str
-    positions: Deque[Tuple[float, float]]  # 中心点坐标队列
-    timestamps: Deque[float]
-    attributes: Dict[str, any]
+# 可能与用户发生碰撞的交通工具类别
+VEHICLE_CLASSES = {"car", "bus", "truck", "motorcycle", "bicycle"}
+
+
+class TrackTable:
+    """物体跟踪表（SoA布局）：每行一个目标，轨迹按列连续存放，便于向量化计算"""
+
+    def __init__(self, capacity: int, window: int):
+        self.window = window
+        # 轨迹为定长环形缓冲：第cursor % window列写入新样本，无需移动已有数据
+        self.pos_xy = np.zeros((capacity, window, 2), np.float32)  # 中心点坐标
+        self.ts = np.zeros((capacity, window), np.float64)
+        self.cursor = np.zeros(capacity, np.int32)  # 累计写入的样本数
+        self.cls_id = np.zeros(capacity, np.int32)
+        self.active = np.zeros(capacity, bool)
+        self.attributes: List[Dict] = [{} for _ in range(capacity)]
+        self.row_of: Dict[int, int] = {}  # 跟踪ID -> 行号
+        self.class_names: List[str] = []
+        self._class_index: Dict[str, int] = {}
+        self._free_rows = list(range(capacity - 1, -1, -1))
+
+    def class_id(self, name: str) -> int:
+        """类别名映射为整数ID（按首次出现顺序分配）"""
+        cid = self._class_index.get(name)
+        if cid is None:
+            cid = self._class_index[name] = len(self.class_names)
+            self.class_names.append(name)
+        return cid
+
+    def add(self, track_id: int, cls: str, attributes: Dict) -> Optional[int]:
+        """为新目标分配一行，表满时返回None"""
+        if not self._free_rows:
+            return None
+        row = self._free_rows.pop()
+        self.row_of[track_id] = row
+        self.cls_id[row] = self.class_id(cls)
+        self.cursor[row] = 0
+        self.active[row] = True
+        self.attributes[row] = dict(attributes)
+        return row
+
+    def append(self, row: int, x: float, y: float, t: float):
+        """追加一个轨迹样本，窗口写满后覆盖最旧的样本"""
+        col = self.cursor[row] % self.window
+        self.pos_xy[row, col] = (x, y)
+        self.ts[row, col] = t
+        self.cursor[row] += 1
+
+    def remove(self, track_id: int):
+        row = self.row_of.pop(track_id)
+        self.active[row] = False
+        self.attributes[row] = {}
+        self._free_rows.append(row)
+
+    def count_class(self, name: str) -> int:
+        """统计某类别当前被跟踪的目标数"""
+        cid = self._class_index.get(name)
+        if cid is None:
+            return 0
+        return int(np.count_nonzero(self.active & (self.cls_id == cid)))
+
+    def rows(self) -> np.ndarray:
+        """当前有效的行号"""
+        return np.flatnonzero(self.active)
+
+    def lengths(self, rows) -> np.ndarray:
+        """各行已记录的样本数（不超过window）"""
+        return np.minimum(self.cursor[rows], self.window)
+
+    def newest(self, rows) -> np.ndarray:
+        """各行最新样本所在的列"""
+        return (self.cursor[rows] - 1) % self.window
+
+    def oldest(self, rows) -> np.ndarray:
+        """各行窗口内最旧样本所在的列"""
+        return (self.cursor[rows] - self.lengths(rows)) % self.window
+
+    def history(self, row: int) -> np.ndarray:
+        """按时间顺序返回某一行已记录的位置"""
+        n = self.lengths(row)
+        return self.pos_xy[row, (self.cursor[row] - n + np.arange(n)) % self.window]
 
 
 class SceneAnalyzer:
@@ -21,7 +91,8 @@ class SceneAnalyzer:
     def __init__(self, config):
         self.config = config
         self.context_window = config.get("scene.context_window", 5)  # 跟踪帧数
-        self.tracks: Dict[int, ObjectTrack] = {}  # 当前跟踪的物体
+        self.tracks = TrackTable(config.get("scene.max_tracks", 64),
+                                 self.context_window)  # 当前跟踪的物体
         self.last_update = time.time()
 
         # 场景规则配置
@@ -31,11 +102,18 @@ class SceneAnalyzer:
             "office": {"required": ["chair", "computer"],
                        "optional": ["desk", "book"]}
         })
+        # 规则预编译为类别位掩码 (必需, 可选)，类别ID与跟踪表共用同一词表
+        self.rule_masks = {
+            scene_type: (self._class_mask(rule.get("required", [])),
+                         self._class_mask(rule.get("optional", [])))
+            for scene_type, rule in self.scene_rules.items()
+        }
 
         # 风险判定参数
         self.risk_params = {
             "speed_threshold": 0.5,  # 像素/秒
-            "distance_threshold": 200  # 像素距离
+            "distance_threshold": 200,  # 像素距离
+            "collision_horizon": 1.5  # 碰撞预测时长（秒）
         }
 
     def analyze(self,
@@ -43,70 +121,77 @@ class SceneAnalyzer:
                 frame: np.ndarray) -> Dict:
         """主分析流程"""
         # 更新跟踪状态
-        self._update_tracks(current_objects)
+        present_mask = self._update_tracks(current_objects)
+        centers = self._object_centers(current_objects)
 
         # 多维度分析
-        scene_type = self._classify_scene(current_objects)
-        risks = self._assess_risks()
-        relations = self._analyze_spatial_relations(current_objects)
+        scene_type = self._classify_scene(present_mask)
+        risks = self._assess_risks(current_objects, centers, frame)
+        relations = self._analyze_spatial_relations(current_objects, centers, frame)
         activities = self._detect_activities()
+        predicted = self._predict_collisions(frame)
 
         return {
             "scene_type": scene_type,
             "potential_risks": risks,
+            "predicted_risks": predicted,
             "spatial_relations": relations,
             "active_objects": activities,
             "timestamp": time.time()
         }
 
-    def _update_tracks(self, objects: List[Dict]):
-        """物体跟踪与状态更新"""
+    def _update_tracks(self, objects: List[Dict]) -> int:
+        """物体跟踪与状态更新，返回当前帧出现的类别位掩码"""
+        now = time.time()
         current_ids = set()
+        present_mask = 0
         for obj in objects:
-            obj_id = obj["id"]
+            present_mask |= 1 << self.tracks.class_id(obj["class"])
+            obj_id = obj.get("id")
+            if obj_id is None:  # 未启用跟踪，无法关联到已有轨迹
+                continue
             bbox = obj["bbox"]
             cx = (bbox[0] + bbox[2]) / 2
             cy = (bbox[1] + bbox[3]) / 2
 
-            if obj_id not in self.tracks:
-                self.tracks[obj_id] = ObjectTrack(
-                    id=obj_id,
-                    cls=obj["class"],
-                    positions=deque(maxlen=self.context_window),
-                    timestamps=deque(maxlen=self.context_window),
-                    attributes=obj.get("attributes", {})
-                )
+            row = self.tracks.row_of.get(obj_id)
+            if row is None:
+                row = self.tracks.add(obj_id, obj["class"], obj.get("attributes", {}))
+                if row is None:  # 跟踪表已满
+                    continue
             else:
-                self.tracks[obj_id].attributes.update(obj["attributes"])
+                self.tracks.attributes[row].update(obj.get("attributes", {}))
 
-            self.tracks[obj_id].positions.append((cx, cy))
-            self.tracks[obj_id].timestamps.append(time.time())
+            self.tracks.append(row, cx, cy, now)
             current_ids.add(obj_id)
 
         # 移除丢失的跟踪目标
-        lost_ids = set(self.tracks.keys()) - current_ids
+        lost_ids = set(self.tracks.row_of) - current_ids
         for lid in lost_ids:
-            del self.tracks[lid]
-
-    def _classify_scene(self, objects: List[Dict]) -> str:
+            self.tracks.remove(lid)
+        return present_mask
+
+    def _class_mask(self, classes: List[str]) -> int:
+        """类别列表转为位掩码（Python整数不限位宽，类别超过64个也适用）"""
+        mask = 0
+        for cls in classes:
+            mask |= 1 << self.tracks.class_id(cls)
+        return mask
+
+    @staticmethod
+    def _object_centers(objects: List[Dict]) -> np.ndarray:
+        """当前帧所有检测框的中心点，形状(N, 2)"""
+        if not objects:
+            return np.empty((0, 2), np.float32)
+        boxes = np.asarray([obj["bbox"] for obj in objects], np.float32)
+        return (boxes[:, 0:2] + boxes[:, 2:4]) * 0.5
+
+    def _classify_scene(self, present_mask: int) -> str:
         """基于规则和机器学习的场景分类"""
-        # 统计物体类别
-        class_counts = defaultdict(int)
-        for obj in objects:
-            class_counts[obj["class"]] += 1
-
-        # 应用规则判断
-        for scene_type, rule in self.scene_rules.items():
-            required_match = all(
-                cls in class_counts
-                for cls in rule["required"]
-            )
-            optional_match = any(
-                cls in class_counts
-                for cls in rule.get("optional", [])
-            )
-
-            if required_match and optional_match:
+        # 应用规则判断：必需类别全部出现，且（若有可选类别）至少出现一个
+        for scene_type, (required, optional) in self.rule_masks.items():
+            if (present_mask & required) == required and (
+                    not optional or present_mask & optional):
                 return scene_type
 
         # 使用机器学习模型（示例）
@@ -114,76 +199,83 @@ class SceneAnalyzer:
 
         return "unknown"
 
-    def _assess_risks(self) -> List[str]:
+    def _assess_risks(self,
+                      current_objects: List[Dict],
+                      centers: np.ndarray,
+                      frame: np.ndarray) -> List[str]:
         """风险因素分析"""
-        risks = []
-        for track in self.tracks.values():
-            # 移动速度分析
-            if len(track.positions) >= 2:
-                dx = track.positions[-1][0] - track.positions[0][0]
-                dy = track.positions[-1][1] - track.positions[0][1]
-                dt = track.timestamps[-1] - track.timestamps[0]
-                speed = np.sqrt(dx ** 2 + dy ** 2) / dt if dt > 0 else 0
-
-                if speed > self.risk_params["speed_threshold"]:
-                    risks.append(f"fast_moving_{track.cls}")
+        risks = set()
+        tracks = self.tracks
+
+        # 移动速度分析：窗口内首尾样本的位移/时间差
+        rows = tracks.rows()
+        rows = rows[tracks.lengths(rows) >= 2]
+        fast_rows = set()
+        if rows.size:
+            last = tracks.newest(rows)
+            first = tracks.oldest(rows)
+            dx = tracks.pos_xy[rows, last, 0] - tracks.pos_xy[rows, first, 0]
+            dy = tracks.pos_xy[rows, last, 1] - tracks.pos_xy[rows, first, 1]
+            dt = tracks.ts[rows, last] - tracks.ts[rows, first]
+            speed = np.where(dt > 0, np.hypot(dx, dy) / np.where(dt > 0, dt, 1), 0)
+
+            fast = rows[speed > self.risk_params["speed_threshold"]]
+            for cid in np.unique(tracks.cls_id[fast]):
+                risks.add(f"fast_moving_{tracks.class_names[cid]}")
+            fast_rows = set(fast.tolist())
 
         # 近距离物体检测
-        main_center = (frame.shape[1] // 2, frame.shape[0] // 2)  # 假设用户位置在画面中心
-        for obj in current_objects:
-            obj_center = ((obj["bbox"][0] + obj["bbox"][2]) // 2,
-                          (obj["bbox"][1] + obj["bbox"][3]) // 2)
-            distance = np.sqrt(
-                (obj_center[0] - main_center[0]) ** 2 +
-                (obj_center[1] - main_center[1]) ** 2
-            )
-            if distance < self.risk_params["distance_threshold"]:
-                risks.append(f"nearby_{obj['class']}")
-
-        return list(set(risks))
+        if len(centers):
+            main_center = (frame.shape[1] / 2, frame.shape[0] / 2)  # 假设用户位置在画面中心
+            distance = np.hypot(centers[:, 0] - main_center[0],
+                                centers[:, 1] - main_center[1])
+            for i in np.flatnonzero(distance < self.risk_params["distance_threshold"]):
+                obj = current_objects[i]
+                risks.add(f"nearby_{obj['class']}")
+                # 在用户附近且正在移动的交通工具
+                if (obj["class"] in VEHICLE_CLASSES
+                        and tracks.row_of.get(obj.get("id")) in fast_rows):
+                    risks.add("moving_vehicle")
+
+        return list(risks)
 
     def _analyze_spatial_relations(self,
-                                   objects: List[Dict]) -> Dict[str, List]:
+                                   objects: List[Dict],
+                                   centers: np.ndarray,
+                                   frame: np.ndarray) -> Dict[str, List]:
         """空间关系分析"""
-        relations = defaultdict(list)
-        reference_point = (frame.shape[1] // 2, frame.shape[0] // 2)  # 以用户为中心
-
-        for obj in objects:
-            # 相对位置判断
-            obj_center = ((obj["bbox"][0] + obj["bbox"][2]) // 2,
-                          (obj["bbox"][1] + obj["bbox"][3]) // 2)
-
-            # 水平方向
-            if obj_center[0] < reference_point[0] - 100:
-                relations["left"].append(obj["class"])
-            elif obj_center[0] > reference_point[0] + 100:
-                relations["right"].append(obj["class"])
-
-            # 垂直方向
-            if obj_center[1] < reference_point[1] - 50:
-                relations["front"].append(obj["class"])
-            elif obj_center[1] > reference_point[1] + 50:
-                relations["back"].append(obj["class"])
-
-        return dict(relations)
+        if not len(centers):
+            return {}
+        reference_point = (frame.shape[1] / 2, frame.shape[0] / 2)  # 以用户为中心
+        dx = centers[:, 0] - reference_point[0]
+        dy = centers[:, 1] - reference_point[1]
+
+        # 水平方向 / 垂直方向
+        relations = {}
+        for direction, mask in (("left", dx < -100), ("right", dx > 100),
+                                ("front", dy < -50), ("back", dy > 50)):
+            hits = np.flatnonzero(mask)
+            if hits.size:
+                relations[direction] = [objects[i]["class"] for i in hits]
+        return relations
 
     def _detect_activities(self) -> List[Dict]:
         """活动物体检测"""
         activities = []
-        for track in self.tracks.values():
-            if len(track.positions) < 2:
+        tracks = self.tracks
+        for track_id, row in tracks.row_of.items():
+            if tracks.lengths(row) < 2:
                 continue
 
-            # 计算移动轨迹方差
-            positions = np.array(track.positions)
-            variance = np.var(positions, axis=0).mean()
-
             # 分析属性变化
-            if "action" in track.attributes:
+            attributes = tracks.attributes[row]
+            if "action" in attributes:
+                # 计算移动轨迹方差
+                variance = np.var(tracks.history(row), axis=0).mean()
                 activities.append({
-                    "id": track.id,
-                    "class": track.cls,
-                    "activity": track.attributes["action"],
+                    "id": track_id,
+                    "class": tracks.class_names[tracks.cls_id[row]],
+                    "activity": attributes["action"],
                     "intensity": variance
                 })
         return activities
@@ -202,25 +294,58 @@ class SceneAnalyzer:
 
     def _analyze_social_context(self):
         """社交场景分析（如人群密度）"""
-        person_count = sum(1 for obj in self.tracks.values()
-                           if obj.cls == "person")
+        person_count = self.tracks.count_class("person")
         if person_count > 5:
             return "crowded"
         return "normal"
 
-    def _predict_trajectory(self, track: ObjectTrack) -> Tuple[float, float]:
-        """基于卡尔曼滤波的轨迹预测"""
-        if len(track.positions) < 3:
-            return track.positions[-1] if track.positions else (0, 0)
+    def _predict_trajectory(self, row: int,
+                            horizon: Optional[float] = None) -> Tuple[float, float]:
+        """基于卡尔曼滤波的轨迹预测（默认预测下一帧，指定horizon则外推相应秒数）"""
+        positions = self.tracks.history(row)
+        if len(positions) < 3:
+            return tuple(positions[-1]) if len(positions) else (0, 0)
 
         # 实现简单的线性预测
-        dx = track.positions[-1][0] - track.positions[-2][0]
-        dy = track.positions[-1][1] - track.positions[-2][1]
+        dx = positions[-1][0] - positions[-2][0]
+        dy = positions[-1][1] - positions[-2][1]
+        steps = 1.0
+        if horizon is not None:
+            newest = self.tracks.newest(row)
+            dt = (self.tracks.ts[row, newest]
+                  - self.tracks.ts[row, (newest - 1) % self.tracks.window])
+            steps = horizon / dt if dt > 0 else 1.0
         return (
-            track.positions[-1][0] + dx,
-            track.positions[-1][1] + dy
+            positions[-1][0] + dx * steps,
+            positions[-1][1] + dy * steps
         )
 
+    def _predict_collisions(self, frame: np.ndarray) -> List[str]:
+        """预测短时间内是否有交通工具正在接近并进入用户附近（画面中心）"""
+        center_x, center_y = frame.shape[1] / 2, frame.shape[0] / 2
+        tracks = self.tracks
+        for row in tracks.row_of.values():
+            if tracks.class_names[tracks.cls_id[row]] not in VEHICLE_CLASSES:
+                continue
+            if tracks.lengths(row) < 3:  # 样本不足，无法估计速度
+                continue
+            cx, cy = tracks.pos_xy[row, tracks.newest(row)]
+            px, py = self._predict_trajectory(row, self.risk_params["collision_horizon"])
+            # 检查从当前位置到预测位置整段路径上离用户最近的点，而不只是终点：
+            # 快速冲向用户的车辆在预测时长内会越过画面中心，终点反而离得远
+            vx, vy = px - cx, py - cy
+            travel = vx * vx + vy * vy
+            if travel == 0:  # 静止（停放）的车辆
+                continue
+            t = ((center_x - cx) * vx + (center_y - cy) * vy) / travel
+            if t <= 0:  # 没有朝向用户的速度分量
+                continue
+            t = min(t, 1.0)
+            closest = np.hypot(cx + t * vx - center_x, cy + t * vy - center_y)
+            if closest < self.risk_params["distance_threshold"]:
+                return ["moving_vehicle"]
+        return []
+
     def _assess_lighting_condition(self, frame: np.ndarray) -> str:
         """环境光照评估"""
         gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+
+from utils.events import (EventBus, EventType, EventFactory, Event, RingBuffer,
+                          DEFAULT_PRIORITY, CRITICAL_PRIORITY)
+
+TIMEOUT = 5
+
+
+def _event(event_type, data=None):
+    return Event(event_type, 0, data, "test")
+
+
+def _wait_until(predicate):
+    deadline = time.time() + TIMEOUT
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_user_command_not_shed_when_congested(monkeypatch):
+    bus = EventBus(capacity=8)
+    monkeypatch.setattr(bus._ring, "congested", lambda: True)
+
+    # 积压时默认优先级的普通事件被丢弃，用户指令仍然接收并在缓冲满时等待
+    assert bus._admission(EventType.OBJECTS_DETECTED, DEFAULT_PRIORITY) is None
+    assert bus._admission(EventType.USER_COMMAND, DEFAULT_PRIORITY) is True
+
+
+def test_alert_from_handler_does_not_deadlock_on_full_ring():
+    bus = EventBus(capacity=8)
+    entered, filled, returned = threading.Event(), threading.Event(), threading.Event()
+    alerts = []
+
+    def handler(event):
+        entered.set()
+        filled.wait(TIMEOUT)
+        # 缓冲已满时在消费者线程内发布警报，不能等待空位
+        bus.publish(EventFactory.create_alert_event("test", "ERROR", "boom"))
+        returned.set()
+
+    bus.subscribe(EventType.OBJECTS_DETECTED, handler)
+    bus.subscribe(EventType.SYSTEM_ALERT, alerts.append)
+
+    bus.publish(_event(EventType.OBJECTS_DETECTED))
+    assert entered.wait(TIMEOUT)
+    for _ in range(bus._ring.capacity):
+        bus.publish(_event(EventType.SCENE_ANALYZED), priority=CRITICAL_PRIORITY)
+    assert bus._ring.occupancy() == bus._ring.capacity
+    filled.set()
+
+    assert returned.wait(TIMEOUT)
+    _wait_until(lambda: alerts)
+    assert [a.data["msg"] for a in alerts] == ["boom"]
+
+
+def test_concurrent_nonblocking_publish_never_overshoots():
+    ring = RingBuffer(capacity=8)
+    accepted = []
+    start = threading.Barrier(16)
+
+    def producer():
+        start.wait()
+        # 无消费者：并发的非阻塞写入只有容量个成功，其余立即返回
+        accepted.append(sum(ring.publish(object(), block=False) for _ in range(4)))
+
+    threads = [threading.Thread(target=producer) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(TIMEOUT)
+    assert not any(t.is_alive() for t in threads)
+    assert sum(accepted) == ring.capacity
+    assert ring.occupancy() == ring.capacity
+
+
+class _Gate:
+    """订阅一个会阻塞的处理器，让消费者线程停在分发中，期间发布的事件留在缓冲里"""
+
+    def __init__(self, bus, event_type=EventType.OBJECTS_DETECTED):
+        self.entered, self.release = threading.Event(), threading.Event()
+        bus.subscribe(event_type, self._handler)
+        bus.publish(_event(event_type))
+        assert self.entered.wait(TIMEOUT)
+
+    def _handler(self, event):
+        self.entered.set()
+        self.release.wait(TIMEOUT)
+
+
+@pytest.mark.parametrize("synchronize", [True, False])
+def test_ring_multiple_producers_no_loss_and_per_producer_order(synchronize):
+    ring = RingBuffer(capacity=16, synchronize_when_full=synchronize)
+    producers, per_producer = 4, 2000
+    received = []
+
+    def consumer():
+        while len(received) < producers * per_producer:
+            received.extend(ring.drain())
+
+    def producer(pid):
+        for n in range(per_producer):
+            ring.publish((pid, n))
+
+    threads = [threading.Thread(target=consumer)]
+    threads += [threading.Thread(target=producer, args=(pid,)) for pid in range(producers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(TIMEOUT * 2)
+    assert not any(t.is_alive() for t in threads)
+
+    assert len(received) == len(set(received)) == producers * per_producer
+    for pid in range(producers):
+        assert [n for p, n in received if p == pid] == list(range(per_producer))
+
+
+def test_ring_blocking_publish_waits_for_space():
+    ring = RingBuffer(capacity=4)
+    for n in range(4):
+        assert ring.publish(n)
+    assert ring.publish("late", block=False) is False
+
+    done = threading.Event()
+    writer = threading.Thread(target=lambda: (ring.publish("late"), done.set()))
+    writer.start()
+    assert not done.wait(0.1)  # 缓冲已满，阻塞等待
+
+    assert ring.consume() == 0
+    assert done.wait(TIMEOUT)
+    writer.join(TIMEOUT)
+    assert [ring.consume() for _ in range(4)] == [1, 2, 3, "late"]
+
+
+def test_admission_sheds_by_priority_under_backlog():
+    bus = EventBus(capacity=8)
+    gate = _Gate(bus)
+    try:
+        # 占用超过2/3之前全部接收
+        for _ in range(6):
+            assert bus.publish(_event(EventType.SCENE_ANALYZED))
+        assert bus._ring.congested()
+        assert bus.publish(_event(EventType.SCENE_ANALYZED)) is False
+        assert bus.publish(_event(EventType.USER_COMMAND))
+        assert bus.publish(_event(EventType.SCENE_ANALYZED), priority=DEFAULT_PRIORITY + 1)
+        # 缓冲已满：非关键事件不等待，直接丢弃
+        assert bus._ring.occupancy() == bus._ring.capacity
+        assert bus.publish(_event(EventType.SCENE_ANALYZED),
+                           priority=DEFAULT_PRIORITY + 1) is False
+        assert bus._dropped[EventType.SCENE_ANALYZED] == 2
+    finally:
+        gate.release.set()
+
+
+def test_latest_only_events_keep_newest_frame():
+    bus = EventBus(capacity=8)
+    frames = []
+    bus.subscribe(EventType.FRAME_CAPTURED, lambda event: frames.append(event.frame))
+    gate = _Gate(bus)
+
+    for n in range(5):
+        assert bus.publish_frame("test", n)
+    # 未分发的旧帧被原地覆盖，只占用一个缓冲位置
+    assert bus._ring.occupancy() == 1
+    gate.release.set()
+
+    _wait_until(lambda: frames)
+    time.sleep(0.05)
+    assert frames == [4]
+    assert bus._dropped[EventType.FRAME_CAPTURED] == 4
+
+
+def test_frame_pool_never_reuses_event_being_dispatched():
+    bus = EventBus(capacity=8)
+    entered, release = threading.Event(), threading.Event()
+    seen = []
+
+    def handler(event):
+        before = event.frame
+        if not entered.is_set():
+            entered.set()
+            release.wait(TIMEOUT)
+        # 分发期间发布的新帧不能改写正在分发的事件对象
+        seen.append((before, event.frame))
+
+    bus.subscribe(EventType.FRAME_CAPTURED, handler)
+    bus.publish_frame("test", 0)
+    assert entered.wait(TIMEOUT)
+    for n in range(1, 6):
+        bus.publish_frame("test", n)
+    release.set()
+
+    _wait_until(lambda: len(seen) == 2)
+    assert seen == [(0, 0), (5, 5)]
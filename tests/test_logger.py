@@ -0,0 +1,69 @@
+import inspect
+import logging
+import sys
+
+import pytest
+
+from utils.logger import ThreadSafeLogger, CallerOnWarningLogger
+
+
+class _Config:
+    """最小配置对象，只提供 get()"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def system_logger(tmp_path, monkeypatch):
+    monkeypatch.setattr(ThreadSafeLogger, "_instance", None)
+    monkeypatch.setattr(sys, "excepthook", sys.excepthook)  # 测试后恢复
+    return ThreadSafeLogger(_Config({"log.path": str(tmp_path / "app.log")}))
+
+
+def test_warning_records_real_caller_line(system_logger):
+    logger = system_logger.get_logger("test_caller_line")
+    capture = _Capture()
+    logger.addHandler(capture)
+
+    line = inspect.currentframe().f_lineno + 1
+    logger.warning("warn")
+    logger.info("info")
+
+    warning, info = capture.records
+    assert warning.lineno == line
+    assert warning.pathname == __file__
+    assert info.lineno == 0
+
+
+def test_logger_class_only_applied_to_module_loggers(system_logger):
+    assert isinstance(system_logger.get_logger("test_own_module"), CallerOnWarningLogger)
+    assert type(logging.getLogger("test_third_party")) is logging.Logger
+
+
+
+def test_malformed_message_does_not_raise(system_logger, capsys):
+    logger = system_logger.get_logger("test_malformed")
+    logger.info("value %d", "x")
+    assert "Logging error" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("name, level", [
+    ("WARN", logging.WARNING),
+    ("fatal", logging.CRITICAL),
+    ("NOTSET", logging.NOTSET),
+])
+def test_level_aliases(name, level):
+    assert ThreadSafeLogger._parse_level(name) == level
@@ -1,10 +1,12 @@
+import bisect
 import threading
-import queue
+import time
 from enum import Enum
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Type, Optional
+from typing import Any, Callable, Dict, List, Tuple, Type, Optional
 from datetime import datetime
 import logging
+import numpy as np
+from collections import Counter, deque
 
 # 初始化日志
 event_logger = logging.getLogger("EventSystem")
@@ -21,23 +23,190 @@ class EventType(Enum):
     SYSTEM_ALERT = 8             # 携带警报信息
     LOW_POWER_MODE = 9           # 进入低功耗模式
 
-@dataclass(frozen=True)
 class Event:
-    """事件基类"""
-    type: EventType
-    timestamp: datetime
-    data: Any
-    source: str                  # 事件来源模块
+    """事件基类（可变、__slots__，帧事件从对象池复用）"""
+    __slots__ = ("type", "timestamp", "data", "source", "frame")
+
+    def __init__(self,
+                 type: EventType,
+                 timestamp: int,          # time.time_ns()纳秒时间戳
+                 data: Any,
+                 source: str,             # 事件来源模块
+                 frame: Any = None):      # 帧事件直接携带图像，不再包一层字典
+        self.type = type
+        self.timestamp = timestamp
+        self.data = data
+        self.source = source
+        self.frame = frame
+
+    @property
+    def datetime(self) -> datetime:
+        """需要可读时间时再转换为datetime"""
+        return datetime.fromtimestamp(self.timestamp / 1e9)
+
+# 发布优先级（数值越大越重要）：默认及以下在积压时可丢弃，关键级在缓冲满时阻塞等待
+DEFAULT_PRIORITY = 5
+CRITICAL_PRIORITY = 8
+DROP_REPORT_INTERVAL = 5.0  # 丢弃统计的输出间隔（秒）
+EMERGENCY_CAPACITY = 16  # 保留队列长度：缓冲满时无法等待的紧急事件暂存于此
+
+# 只有最新值有意义的高频事件：分发前被新事件取代的旧事件直接丢弃
+LATEST_ONLY_TYPES = frozenset({EventType.FRAME_CAPTURED, EventType.IMAGE_PREPROCESSED})
+
+class _LatestSlot:
+    """只保留最新值的事件在环形缓冲中的占位，event为None表示已被取走"""
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event: Optional[Event] = None
+
+class _ProducerCursor:
+    """生产者侧状态，与消费者侧状态分属不同对象，避免两侧频繁写入同一缓存行"""
+    __slots__ = ("head", "claim_lock", "full_lock", "waiting", "space")
+
+    def __init__(self):
+        self.head = 0  # 下一个待认领的序号
+        self.claim_lock = threading.Lock()  # 只保护容量检查与序号递增，临界区极短
+        self.full_lock = threading.Lock()
+        self.waiting = False  # 是否有生产者在等待空位
+        self.space = threading.Event()
+
+class _ConsumerCursor:
+    """消费者侧状态"""
+    __slots__ = ("tail", "waiting", "wakeup")
+
+    def __init__(self):
+        self.tail = 0  # 下一个待消费的序号，只由消费者线程修改
+        self.waiting = False  # 消费者是否在等待新元素
+        self.wakeup = threading.Event()
+
+class RingBuffer:
+    """预分配槽位的多生产者/单消费者环形缓冲
+
+    生产者在一个极短的锁内检查容量并认领序号，认领到的槽位一定已被消费者腾空，
+    写入时无需再等待；消费者按序号顺序读取并清空槽位。
+    """
+    def __init__(self, capacity: int = 1024, synchronize_when_full: bool = True):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError("环形缓冲容量必须是2的幂")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._slots: List[Any] = [None] * capacity
+        self._p = _ProducerCursor()
+        self._c = _ConsumerCursor()
+        # 缓冲满时只允许一个生产者等待空位，其余生产者在锁上阻塞而不是各自轮询
+        self.synchronize_when_full = synchronize_when_full
+
+    def occupancy(self) -> int:
+        return self._p.head - self._c.tail
+
+    def congested(self) -> bool:
+        """占用超过2/3"""
+        return self._p.head - self._c.tail > self.capacity * 2 // 3
+
+    def publish(self, item: Any, block: bool = True) -> bool:
+        """写入一个元素；缓冲已满且block为False时直接丢弃并返回False（不会等待）"""
+        seq = self._try_claim()
+        if seq is None:
+            if not block:
+                return False
+            if self.synchronize_when_full:
+                with self._p.full_lock:
+                    seq = self._claim_when_space()
+            else:
+                seq = self._claim_when_space()
+        return self._write(seq, item)
+
+    def _try_claim(self) -> Optional[int]:
+        """有空位时认领一个序号，缓冲已满时返回None"""
+        p = self._p
+        with p.claim_lock:
+            seq = p.head
+            if seq - self._c.tail >= self.capacity:
+                return None
+            p.head = seq + 1
+            return seq
+
+    def _claim_when_space(self) -> int:
+        """等待消费者腾出槽位后认领"""
+        p = self._p
+        while True:
+            seq = self._try_claim()
+            if seq is not None:
+                p.waiting = False
+                return seq
+            p.waiting = True
+            p.space.clear()
+            if p.head - self._c.tail >= self.capacity:
+                p.space.wait(0.01)
+
+    def _write(self, seq: int, item: Any) -> bool:
+        c = self._c
+        # 认领时已确认该槽位被消费者腾空（tail只增不减），直接写入
+        self._slots[seq & self._mask] = item
+        if c.waiting:
+            c.wakeup.set()
+        return True
+
+    def consume(self) -> Any:
+        """按发布顺序取出下一个元素，没有时阻塞等待"""
+        c = self._c
+        index = c.tail & self._mask
+        while self._slots[index] is None:
+            # 先声明等待再复查槽位，避免错过生产者的唤醒
+            c.waiting = True
+            c.wakeup.clear()
+            if self._slots[index] is None:
+                c.wakeup.wait(0.1)
+            c.waiting = False
+
+        item = self._slots[index]
+        self._slots[index] = None
+        c.tail += 1
+        if self._p.waiting:
+            self._p.space.set()
+        return item
+
+    def drain(self) -> List[Any]:
+        """阻塞取出一个元素，再顺带取走当前已就绪的全部元素"""
+        batch = [self.consume()]
+        c = self._c
+        index = c.tail & self._mask
+        while self._slots[index] is not None:
+            batch.append(self._slots[index])
+            self._slots[index] = None
+            c.tail += 1
+            index = c.tail & self._mask
+        if self._p.waiting:
+            self._p.space.set()
+        return batch
 
 class EventBus:
     """线程安全的事件总线"""
-    def __init__(self):
-        self._subscriptions: Dict[EventType, List[Callable]] = {}
-        self._queue = queue.PriorityQueue()  # (优先级, 事件)
+    def __init__(self, capacity: int = 1024, synchronize_enqueue_when_full: bool = True):
+        # 每种事件的订阅者按优先级降序存为两个平行数组，分发只遍历处理器数组
+        self._priorities: Dict[EventType, List[int]] = {}  # 存负优先级，便于有序插入
+        self._handlers: Dict[EventType, List[Callable]] = {}
+        self._ring = RingBuffer(capacity, synchronize_enqueue_when_full)
+        # 帧事件对象池：帧事件逐个覆盖，任一时刻最多一个待分发、一个分发中，
+        # 三个对象即可保证总有一个空闲
+        self._frame_pool = [Event(EventType.FRAME_CAPTURED, 0, None, "")
+                            for _ in range(3)]
+        self._dispatching: Optional[Event] = None  # 正在分发的最新值事件
+        # 只保留最新值的事件类型各有一个待分发槽，尚未分发时新事件直接覆盖旧事件
+        self._latest = {t: _LatestSlot() for t in LATEST_ONLY_TYPES}
+        self._latest_lock = threading.Lock()
+        self._emergency: deque = deque(maxlen=EMERGENCY_CAPACITY)  # 缓冲满时紧急事件的保留队列
+        # 分发耗时统计：事件类型 -> [次数, 总耗时ns, 最大耗时ns]，预先建好避免热路径上插入
+        self._metrics: Dict[EventType, List[int]] = {t: [0, 0, 0] for t in EventType}
+        self._dropped: Counter = Counter()  # 积压丢弃的事件数，按类型统计
+        self._last_drop_report = time.time()
         self._lock = threading.RLock()
+        self._batch_end_hooks: Tuple[Callable[[], None], ...] = ()
+        # 处理器数组的只读快照：订阅时整体替换（写时复制），分发时无需加锁
+        self._handlers_snapshot: Dict[EventType, Tuple[Callable, ...]] = {}
         self._worker = threading.Thread(target=self._process_events, daemon=True)
         self._worker.start()
-        self._handlers = {}
 
     def subscribe(self,
                 event_type: EventType,
@@ -45,39 +214,165 @@ class EventBus:
                 priority: int = 5):
         """订阅指定类型事件"""
         with self._lock:
-            if event_type not in self._subscriptions:
-                self._subscriptions[event_type] = []
-            self._subscriptions[event_type].append((priority, handler))
-            self._subscriptions[event_type].sort(reverse=True, key=lambda x: x[0])
+            priorities = self._priorities.setdefault(event_type, [])
+            handlers = self._handlers.setdefault(event_type, [])
+            # 同优先级按订阅先后排列
+            index = bisect.bisect_right(priorities, -priority)
+            priorities.insert(index, -priority)
+            handlers.insert(index, handler)
+            self._handlers_snapshot = {k: tuple(v) for k, v in self._handlers.items()}
+
+    def on_batch_end(self, hook: Callable[[], None]):
+        """注册批末回调：每批事件分发完后调用一次，供文件/音频等处理器集中刷新"""
+        with self._lock:
+            self._batch_end_hooks = self._batch_end_hooks + (hook,)
+
+    def publish(self, event: Event, priority: int = DEFAULT_PRIORITY) -> bool:
+        """发布事件到总线（按发布顺序分发，积压时按优先级分级丢弃）"""
+        block = self._admission(event.type, priority)
+        if block is None:
+            self._dropped[event.type] += 1
+            return False
+        # 处理器在消费者线程内发布时不能等待空位：空位只有消费者自己才能腾出
+        wait = block and threading.current_thread() is not self._worker
+        if event.type in LATEST_ONLY_TYPES:
+            return self._publish_latest(event, wait)
+        if self._ring.publish(event, block=wait):
+            return True
+        if block:
+            # 本应等待的紧急事件放入保留队列，在当前一批处理完后分发
+            self._emergency.append(event)
+            return True
+        self._dropped[event.type] += 1
+        return False
+
+    def publish_nowait(self, event: Event):
+        """不经过积压策略、从不等待的发布，供异常钩子等不能阻塞的路径使用
+
+        缓冲已满时放入保留队列，在消费者处理完当前一批后分发。
+        """
+        if not self._ring.publish(event, block=False):
+            self._emergency.append(event)
+
+    def publish_frame(self, source: str, frame: Any) -> bool:
+        """发布帧事件：复用对象池中的Event，不再逐帧构造事件和数据字典"""
+        if self._ring.congested():
+            self._dropped[EventType.FRAME_CAPTURED] += 1
+            return False
+        slot = self._latest[EventType.FRAME_CAPTURED]
+        with self._latest_lock:
+            # 取一个既不在槽位中待分发、也不在分发中的池对象
+            pending, dispatching = slot.event, self._dispatching
+            event = next(e for e in self._frame_pool
+                         if e is not pending and e is not dispatching)
+            event.timestamp = time.time_ns()
+            event.source = source
+            event.frame = frame
+            slot.event = event
+        return self._enqueue_latest(slot, EventType.FRAME_CAPTURED,
+                                    pending is not None, block=False)
+
+    def _publish_latest(self, event: Event, block: bool) -> bool:
+        """只保留最新值的事件：槽位中已有未分发的旧事件时原地覆盖，不再占用新的缓冲位置"""
+        slot = self._latest[event.type]
+        with self._latest_lock:
+            pending = slot.event is not None
+            slot.event = event
+        return self._enqueue_latest(slot, event.type, pending, block)
 
-    def publish(self, event: Event, priority: int = 5):
-        """发布事件到总线"""
-        self._queue.put((-priority, event))  # 负号实现优先级队列
+    def _enqueue_latest(self, slot: "_LatestSlot", event_type: EventType,
+                        pending: bool, block: bool) -> bool:
+        """槽位原本为空时把槽位放入环形缓冲；否则新事件已覆盖旧事件，无需入队"""
+        if pending:
+            self._dropped[event_type] += 1  # 被覆盖的旧事件
+            return True
+
+        if self._ring.publish(slot, block=block):
+            return True
+        with self._latest_lock:
+            slot.event = None
+        self._dropped[event_type] += 1
+        return False
+
+    def _take_latest(self, slot: "_LatestSlot") -> Event:
+        """消费者取出槽位中的最新事件并清空槽位，之后的同类事件重新入队"""
+        with self._latest_lock:
+            event, slot.event = slot.event, None
+            self._dispatching = event
+        return event
+
+    def _admission(self, event_type: EventType, priority: int) -> Optional[bool]:
+        """分级积压策略：返回None表示丢弃，否则返回缓冲满时是否阻塞等待
+
+        占用低于2/3时全部接收；超过2/3后丢弃默认及以下优先级的事件；
+        缓冲已满时只有系统警报、用户指令和关键优先级阻塞等待，其余丢弃。
+        """
+        # 用户指令以默认优先级发布，但丢弃会让用户的操作无响应
+        if (event_type is EventType.SYSTEM_ALERT or event_type is EventType.USER_COMMAND
+                or priority >= CRITICAL_PRIORITY):
+            return True
+        if priority <= DEFAULT_PRIORITY and self._ring.congested():
+            return None
+        return False
+
+    def _report_drops(self):
+        """定期输出积压丢弃统计"""
+        now = time.time()
+        if not self._dropped or now - self._last_drop_report < DROP_REPORT_INTERVAL:
+            return
+        dropped, self._dropped = self._dropped, Counter()
+        self._last_drop_report = now
+        event_logger.warning(
+            f"事件积压，已丢弃: {', '.join(f'{t.name}={n}' for t, n in dropped.items())}")
 
     def _process_events(self):
-        """事件处理线程"""
+        """事件处理线程：每次唤醒取走所有已就绪事件，成批分发"""
         while True:
             try:
-                priority, event = self._queue.get()
-                self._dispatch(event)
+                batch = self._ring.drain()
+                last = len(batch) - 1
+                for i, event in enumerate(batch):
+                    if event.__class__ is _LatestSlot:
+                        event = self._take_latest(event)
+                    self._dispatch(event, end_of_batch=(i == last))
+                # 只处理本轮开始时已有的紧急事件，分发中新加入的留到下一轮
+                for _ in range(len(self._emergency)):
+                    self._dispatch(self._emergency.popleft())
+                self._report_drops()
             except Exception as e:
                 event_logger.error(f"事件处理失败: {e}")
 
-    def _dispatch(self, event: Event):
-        """分发事件给订阅者"""
-        with self._lock:
-            handlers = self._subscriptions.get(event.type, [])
-            for _, handler in handlers:
+    def _dispatch(self, event: Event, end_of_batch: bool = True):
+        """分发事件给订阅者，批内最后一个事件分发后执行批末回调"""
+        start = time.perf_counter_ns()
+        for handler in self._handlers_snapshot.get(event.type, ()):
+            try:
+                handler(event)
+            except Exception as e:
+                event_logger.error(f"事件处理回调错误: {e}")
+        elapsed = time.perf_counter_ns() - start
+        metric = self._metrics[event.type]
+        metric[0] += 1
+        metric[1] += elapsed
+        if elapsed > metric[2]:
+            metric[2] = elapsed
+
+        if end_of_batch:
+            for hook in self._batch_end_hooks:
                 try:
-                    handler(event)
+                    hook()
                 except Exception as e:
-                    event_logger.error(f"事件处理回调错误: {e}")
+                    event_logger.error(f"批末回调错误: {e}")
+
+    def most_contended(self, top: int = 3) -> List[Tuple[EventType, int, int, int]]:
+        """按处理器总耗时排序的事件类型：(类型, 次数, 总耗时ns, 最大耗时ns)"""
+        ranked = sorted(self._metrics.items(), key=lambda item: item[1][1], reverse=True)
+        return [(t, *m) for t, m in ranked[:top] if m[0]]
 
     def register_handler(self,
                        event_type: EventType,
-                       handler: Callable,
-                       priority: int = 5):
-        """装饰器注册处理器"""
+                       priority: int = DEFAULT_PRIORITY):
+        """装饰器注册处理器：@bus.register_handler(EventType.X)"""
         def decorator(func):
             self.subscribe(event_type, func, priority)
             return func
@@ -87,18 +382,20 @@ class EventFactory:
     """事件生成工厂"""
     @staticmethod
     def create_frame_event(source: str, frame: np.ndarray) -> Event:
+        """单独构造帧事件；相机采集路径使用EventBus.publish_frame复用对象池"""
         return Event(
             type=EventType.FRAME_CAPTURED,
-            timestamp=datetime.now(),
-            data={"frame": frame},
-            source=source
+            timestamp=time.time_ns(),
+            data=None,
+            source=source,
+            frame=frame
         )
 
     @staticmethod
     def create_alert_event(source: str, level: str, message: str) -> Event:
         return Event(
             type=EventType.SYSTEM_ALERT,
-            timestamp=datetime.now(),
+            timestamp=time.time_ns(),
             data={"level": level, "msg": message},
             source=source
         )
@@ -107,7 +404,7 @@ class EventFactory:
     def create_command_event(command: str) -> Event:
         return Event(
             type=EventType.USER_COMMAND,
-            timestamp=datetime.now(),
+            timestamp=time.time_ns(),
             data={"command": command},
             source="UserInteraction"
         )
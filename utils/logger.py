@@ -4,13 +4,55 @@ import logging.handlers
 from logging import Logger
 from typing import Dict, Optional, Any
 from pathlib import Path
+from collections import OrderedDict
 import sys
 import threading
-import queue
+import time
 from datetime import datetime
 import traceback
 from .config import ConfigManager
-from .events import EventBus, EventType, EventFactory
+from .events import EventBus, EventType, EventFactory, RingBuffer
+
+
+# 已格式化异常堆栈的LRU缓存：同一位置反复抛出的相同异常（如相机驱动抖动）不再重复格式化
+_EXC_CACHE_SIZE = 64
+_exc_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_exc_cache_lock = threading.Lock()
+
+
+def _format_exception(exc_type, exc_value, exc_traceback) -> str:
+    # 键：异常类型、异常描述与各层调用位置（代码对象+行号），比格式化整个堆栈便宜得多
+    frames = []
+    tb = exc_traceback
+    while tb is not None:
+        frames.append((id(tb.tb_frame.f_code), tb.tb_lineno))
+        tb = tb.tb_next
+    key = (exc_type, repr(exc_value), tuple(frames))
+
+    with _exc_cache_lock:
+        stack = _exc_cache.get(key)
+        if stack is not None:
+            _exc_cache.move_to_end(key)
+            return stack
+
+    stack = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+    with _exc_cache_lock:
+        _exc_cache[key] = stack
+        if len(_exc_cache) > _EXC_CACHE_SIZE:
+            _exc_cache.popitem(last=False)
+    return stack
+
+
+_LEVELS = {
+    "NOTSET": logging.NOTSET,
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "WARN": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+    "FATAL": logging.CRITICAL,
+}
 
 
 class ThreadSafeLogger:
@@ -19,17 +61,23 @@ class ThreadSafeLogger:
     _lock = threading.Lock()
 
     def __new__(cls, config: Optional[ConfigManager] = None):
+        # 快速路径：已初始化后只读一次类属性，不再加锁
+        instance = cls._instance
+        if instance is not None:
+            return instance
+
         with cls._lock:
+            # 双重检查：只有首次创建时加锁，且初始化完成后才对外可见
             if cls._instance is None:
-                cls._instance = super().__new__(cls)
-                cls._instance._init(config or ConfigManager())
+                instance = super().__new__(cls)
+                instance._init(config or ConfigManager())
+                cls._instance = instance
             return cls._instance
 
     def _init(self, config: ConfigManager):
         """初始化日志系统"""
         self.config = config
         self.event_bus = None  # 可选的事件总线引用
-        self._log_queue = queue.Queue(-1)
         self._handlers = []
 
         # 初始化根记录器
@@ -46,6 +94,7 @@ class ThreadSafeLogger:
 
         # 初始化各模块日志记录器缓存
         self.module_loggers: Dict[str, logging.Logger] = {}
+        self._loggers_lock = threading.Lock()
 
     def connect_event_bus(self, bus: EventBus):
         """连接事件总线用于错误警报"""
@@ -53,10 +102,7 @@ class ThreadSafeLogger:
 
     def _setup_async_handlers(self):
         """配置异步日志处理器"""
-        formatter = logging.Formatter(
-            fmt="%(asctime)s [%(module)s:%(lineno)d] [%(context)s] %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
+        formatter = LevelFormatter(datefmt="%Y-%m-%d %H:%M:%S")
 
         # 控制台处理器
         console = logging.StreamHandler()
@@ -73,26 +119,38 @@ class ThreadSafeLogger:
         )
         file.setFormatter(formatter)
 
-        # 使用队列监听器
+        # 所有模块共用一个异步输出器，由单一后台线程写出
         self._handlers = [console, file]
-        self.queue_listener = logging.handlers.QueueListener(
-            self._log_queue, *self._handlers)
-        self.queue_listener.start()
+        self._appender = AsyncAppender(
+            self._handlers, self.config.get("log.buffer_size", 4096))
 
     def get_logger(self, module: str) -> logging.Logger:
-        """获取模块日志记录器"""
-        if module not in self.module_loggers:
-            logger = logging.getLogger(module)
-            logger.propagate = False
-            logger.setLevel(self.root_logger.level)
+        """获取模块日志记录器（命中缓存时无锁）"""
+        logger = self.module_loggers.get(module)
+        if logger is not None:
+            return logger
+
+        # 未命中时加锁创建：logging.getLogger对同名返回同一对象，
+        # 并发创建会重复挂载处理器
+        with self._loggers_lock:
+            logger = self.module_loggers.get(module)
+            if logger is None:
+                logger = self._build_logger(module)
+                self.module_loggers[module] = logger
+            return logger
 
-            # 添加队列处理器
-            handler = logging.handlers.QueueHandler(self._log_queue)
-            handler.addFilter(ContextFilter(module))
-            logger.addHandler(handler)
+    def _build_logger(self, module: str) -> logging.Logger:
+        logger = logging.getLogger(module)
+        # 只对本系统的模块记录器跳过WARNING以下的调用位置查找，不影响第三方库的记录器
+        if type(logger) is logging.Logger:
+            logger.__class__ = CallerOnWarningLogger
+        logger.propagate = False
+        logger.setLevel(self.root_logger.level)
 
-            self.module_loggers[module] = logger
-        return self.module_loggers[module]
+        # 上下文过滤器挂在记录器上，在调用线程中执行；记录交给共用的异步输出器
+        logger.addFilter(ContextFilter(module))
+        logger.addHandler(self._appender)
+        return logger
 
     def _global_except_hook(self, exc_type, exc_value, exc_traceback):
         """全局异常捕获"""
@@ -102,23 +160,30 @@ class ThreadSafeLogger:
             exc_info=(exc_type, exc_value, exc_traceback)
         )
 
-        # 发布系统警报事件
+        stack = _format_exception(exc_type, exc_value, exc_traceback)
+        # 异步输出器可能来不及写出，同步写一份到标准错误
+        try:
+            sys.__stderr__.write(stack)
+            sys.__stderr__.flush()
+        except Exception:
+            pass
+
+        # 发布系统警报事件：走不加锁、不阻塞的路径，避免在异常现场等待事件总线
         if self.event_bus:
-            stack = "".join(traceback.format_exception(
-                exc_type, exc_value, exc_traceback))
-            self.event_bus.publish(
+            self.event_bus.publish_nowait(
                 EventFactory.create_alert_event(
                     "Logger",
                     "CRITICAL",
                     f"未处理异常: {exc_value}\n{stack}"
-                ),
-                priority=1
+                )
             )
 
     def update_config(self, new_config: Dict[str, Any]):
         """动态更新日志配置"""
         if "log.level" in new_config:
             level = self._parse_level(new_config["log.level"])
+            if level == self.root_logger.level:
+                return
             self.root_logger.setLevel(level)
             for logger in self.module_loggers.values():
                 logger.setLevel(level)
@@ -126,7 +191,107 @@ class ThreadSafeLogger:
     @staticmethod
     def _parse_level(level: str) -> int:
         """转换日志级别字符串为常量"""
-        return getattr(logging, level.upper(), logging.INFO)
+        return _LEVELS.get(level.upper(), logging.INFO)
+
+
+class AsyncAppender(logging.Handler):
+    """异步日志输出器：emit只把记录写入环形缓冲，后台线程成批写出
+
+    替代QueueHandler/QueueListener，不经过queue.Queue的锁；
+    流式目标每批拼接为一次write并只flush一次，而不是每条记录一次write+flush。
+    """
+
+    def __init__(self, targets, capacity: int = 4096):
+        super().__init__()
+        self.targets = list(targets)
+        self._ring = RingBuffer(capacity)
+        self._worker = threading.Thread(
+            target=self._drain_loop, name="log-appender", daemon=True)
+        self._worker.start()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            # 在调用线程中固化消息文本，避免参数对象在写出前被修改
+            record.msg = record.getMessage()
+            record.args = None
+            self._ring.publish(record)
+        except Exception:
+            self.handleError(record)
+
+    def _drain_loop(self):
+        while True:
+            batch = self._ring.drain()
+            for target in self.targets:
+                self._write_batch(target, batch)
+
+    @staticmethod
+    def _write_batch(target: logging.Handler, batch):
+        """把一批记录写到一个目标：流式目标拼接后一次write、一次flush"""
+        records = [r for r in batch if r.levelno >= target.level]
+        if not records:
+            return
+        if not isinstance(target, logging.StreamHandler) or target.stream is None:
+            for record in records:
+                target.handle(record)
+            return
+
+        lines = []
+        for record in records:
+            try:
+                lines.append(target.format(record) + target.terminator)
+            except Exception:
+                target.handleError(record)
+        try:
+            # 轮转按批检查：按时间轮转只比较时间戳，不再逐条记录检查文件
+            if isinstance(target, logging.handlers.TimedRotatingFileHandler):
+                if time.time() >= target.rolloverAt:
+                    target.doRollover()
+            elif (isinstance(target, logging.handlers.BaseRotatingHandler)
+                    and target.shouldRollover(records[0])):
+                target.doRollover()
+            target.stream.write("".join(lines))
+            target.flush()
+        except Exception:
+            target.handleError(records[-1])
+
+
+class CallerOnWarningLogger(logging.Logger):
+    """低于WARNING的记录跳过findCaller（逐帧遍历调用栈），只有WARNING及以上记录文件和行号"""
+
+    def _log(self, level, msg, args, exc_info=None, extra=None,
+             stack_info=False, stacklevel=1):
+        if level >= logging.WARNING or stack_info:
+            # 多跳过本方法这一层，findCaller才能定位到真正的调用者
+            super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+            return
+
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        record = self.makeRecord(self.name, level, "(unknown file)", 0, msg, args,
+                                 exc_info, "(unknown function)", extra)
+        self.handle(record)
+
+
+class LevelFormatter(logging.Formatter):
+    """按级别选择格式：WARNING及以上带行号，其余记录不含调用位置"""
+    BRIEF = "%(asctime)s [%(module)s] [%(context)s] %(levelname)s - %(message)s"
+    DETAILED = "%(asctime)s [%(module)s:%(lineno)d] [%(context)s] %(levelname)s - %(message)s"
+
+    def __init__(self, datefmt: Optional[str] = None):
+        super().__init__(fmt=self.BRIEF, datefmt=datefmt)
+        self._detailed = logging.Formatter(fmt=self.DETAILED, datefmt=datefmt)
+
+    def format(self, record):
+        if record.levelno >= logging.WARNING:
+            return self._detailed.format(record)
+        return super().format(record)
+
+
+# 线程上下文字符串的线程本地缓存
+_thread_context = threading.local()
 
 
 class ContextFilter(logging.Filter):
@@ -142,27 +307,35 @@ class ContextFilter(logging.Filter):
         return True
 
     def _get_context(self) -> str:
-        """获取运行时上下文信息"""
-        thread = threading.current_thread()
-        return f"{thread.name}:{thread.ident}"
+        """获取运行时上下文信息（每个线程只计算一次）"""
+        context = getattr(_thread_context, "value", None)
+        if context is None:
+            thread = threading.current_thread()
+            context = _thread_context.value = f"{thread.name}:{thread.ident}"
+        return context
 
 
 def log_call(log_level: int = logging.DEBUG):
     """记录函数调用的装饰器"""
 
     def decorator(func):
+        # 装饰时解析一次记录器，调用时不再经过logging的全局字典和锁
+        logger = logging.getLogger(func.__module__)
+
         def wrapper(*args, **kwargs):
-            logger = logging.getLogger(func.__module__)
-            logger.log(
-                log_level,
-                f"调用 {func.__name__} 参数: {args} {kwargs}"
-            )
-            try:
-                result = func(*args, **kwargs)
+            if logger.isEnabledFor(log_level):
                 logger.log(
-                    log_level,
-                    f"函数 {func.__name__} 返回: {result}"
+                    log_level, "调用 %s 参数: %r %r", func.__name__,
+                    tuple(_summarize(a) for a in args),
+                    {k: _summarize(v) for k, v in kwargs.items()}
                 )
+            try:
+                result = func(*args, **kwargs)
+                if logger.isEnabledFor(log_level):
+                    logger.log(
+                        log_level, "函数 %s 返回: %r",
+                        func.__name__, _summarize(result)
+                    )
                 return result
             except Exception as e:
                 logger.exception(f"函数 {func.__name__} 抛出异常: {e}")
@@ -171,3 +344,22 @@ def log_call(log_level: int = logging.DEBUG):
         return wrapper
 
     return decorator
+
+
+class _ArraySummary:
+    """数组参数的简短表示，避免日志里输出整帧像素"""
+    __slots__ = ("shape", "dtype")
+
+    def __init__(self, value):
+        self.shape = value.shape
+        self.dtype = value.dtype
+
+    def __repr__(self):
+        return f"<ndarray {self.shape} {self.dtype}>"
+
+
+def _summarize(value):
+    # 按鸭子类型识别numpy数组，日志模块不引入numpy依赖
+    if hasattr(value, "shape") and hasattr(value, "dtype"):
+        return _ArraySummary(value)
+    return value